@@ -8,41 +8,63 @@ and first-time RSVPs (who didn't attend) to understand conversion patterns.
 """
 
 import argparse
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Charts are only written to disk, so skip GUI backend probing
 import matplotlib.pyplot as plt
 
+# Resolution and PNG metadata used for every saved chart
+FIGURE_DPI = 100
+FIGURE_METADATA = {'Software': None}
+
+# Big parties are identified by these keywords in the event name
+PARTY_NAMES = ['launch', 'sababa nights', 'bsmnt', 'fall 2025']
+PARTY_NAME_PATTERN = re.compile('|'.join(re.escape(name) for name in PARTY_NAMES))
+
 def create_master_dataset(attendance_path, events_path, people_path):
     """Load and merge all data into a single master dataset."""
     
-    # Load CSVs
-    attendance = pd.read_csv(attendance_path)
-    events = pd.read_csv(events_path)
-    people = pd.read_csv(people_path)
-    
-    # Parse datetime columns
-    attendance['rsvp_datetime'] = pd.to_datetime(attendance['rsvp_datetime'], errors='coerce')
-    events['start_datetime'] = pd.to_datetime(events['start_datetime'], errors='coerce')
-    
-    # Convert boolean columns
-    attendance['rsvp'] = attendance['rsvp'].astype(bool)
-    attendance['checked_in'] = attendance['checked_in'].astype(bool)
-    attendance['approved'] = attendance['approved'].astype(int)
-    
-    # Merge everything into master dataset
-    master = attendance.merge(events, left_on='event_id', right_on='id', suffixes=('', '_event'))
-    master = master.merge(people, left_on='person_id', right_on='id', suffixes=('', '_person'))
-    
-    # Calculate first attendance (checked_in = True) per person
-    first_attendance = master[master['checked_in']].groupby('person_id').agg({
+    # Load CSVs, reading only the columns the analyses use, already typed
+    # (repeated event strings become categoricals so merges and groupbys
+    # work on integer codes)
+    attendance = pd.read_csv(
+        attendance_path,
+        usecols=['id', 'person_id', 'event_id', 'rsvp', 'approved', 'checked_in', 'rsvp_datetime'],
+        dtype={'rsvp': 'bool', 'checked_in': 'bool', 'approved': 'int8'}
+    )
+    events = pd.read_csv(
+        events_path,
+        usecols=['id', 'event_name', 'category', 'start_datetime'],
+        dtype={'event_name': 'category', 'category': 'category'}
+    )
+    people = pd.read_csv(people_path, usecols=lambda col: col in ('id', 'gender', 'is_jewish'))
+    
+    # Parse datetime columns (offsets are mixed, so this can't use parse_dates).
+    # Normalizing to UTC keeps them datetime64 rather than object columns of
+    # Timestamps, so every "later than" comparison runs on int64 nanoseconds
+    attendance['rsvp_datetime'] = pd.to_datetime(attendance['rsvp_datetime'], errors='coerce', utc=True)
+    events['start_datetime'] = pd.to_datetime(events['start_datetime'], errors='coerce', utc=True)
+    
+    # Merge everything into master dataset (joining against the id index
+    # avoids building a hash table on the events/people side)
+    master = attendance.join(events.set_index('id'), on='event_id', how='inner')
+    master = master.join(people.set_index('id'), on='person_id', how='inner')
+    
+    # Calculate first (and last) attendance (checked_in = True) per person
+    first_attendance = master.loc[master['checked_in'], ['person_id', 'event_id', 'start_datetime']].groupby('person_id').agg({
         'event_id': 'first',
-        'start_datetime': 'min'
+        'start_datetime': ['min', 'max']
     }).reset_index()
-    first_attendance.columns = ['person_id', 'first_attendance_event_id', 'first_attendance_datetime']
+    first_attendance.columns = ['person_id', 'first_attendance_event_id', 'first_attendance_datetime', 'last_attendance_datetime']
     
     # Calculate first RSVP per person
-    first_rsvp = master[master['rsvp']].groupby('person_id').agg({
+    first_rsvp = master.loc[master['rsvp'], ['person_id', 'event_id', 'start_datetime']].groupby('person_id').agg({
         'event_id': 'first',
         'start_datetime': 'min'
     }).reset_index()
@@ -56,46 +78,73 @@ def create_master_dataset(attendance_path, events_path, people_path):
     master['is_first_attendance'] = (master['event_id'] == master['first_attendance_event_id'])
     master['is_first_rsvp'] = (master['event_id'] == master['first_rsvp_event_id'])
     
+    # Unique RSVPs and attendees per event, computed in one pass and shared by
+    # every per-event analysis
+    event_totals = (
+        master.groupby(['event_id', 'person_id'])[['rsvp', 'checked_in']].any()
+        .groupby('event_id').sum()
+        .rename(columns={'rsvp': 'total_rsvps', 'checked_in': 'total_attendees'})
+    )
+    events = events.join(event_totals, on='id')
+    events[['total_rsvps', 'total_attendees']] = events[['total_rsvps', 'total_attendees']].fillna(0).astype(int)
+    
+    return master, events
+
+def load_master_dataset(attendance_path, events_path, people_path, cache_dir):
+    """Return (master, events), reusing a cached copy if the input CSVs are unchanged."""
+    
+    # Key the cache on each input's path, size, and modification time
+    input_stats = []
+    for path in (attendance_path, events_path, people_path):
+        stat = Path(path).stat()
+        input_stats.append((str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns))
+    cache_key = hashlib.sha1(repr(input_stats).encode()).hexdigest()[:16]
+    cache_path = cache_dir / f'master_{cache_key}.pkl'
+    
+    if cache_path.exists():
+        print(f"Using cached master dataset: {cache_path}")
+        return pd.read_pickle(cache_path)
+    
+    master, events = create_master_dataset(attendance_path, events_path, people_path)
+    
+    # Drop caches for older inputs, then save this one
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob('master_*.pkl'):
+        stale.unlink()
+    pd.to_pickle((master, events), cache_path)
+    
     return master, events
 
 def retention_analysis(master, events, outdir):
     """Analyze retention by event including RSVPs."""
     
     # Get attendees and RSVPs per event and who returned later
-    retention_data = []
+    # (slice only the columns used, rather than copying every master column)
+    cols = ['person_id', 'event_id', 'start_datetime', 'last_attendance_datetime']
+    rsvped = master.loc[master['rsvp'], cols]
+    attended = master.loc[master['checked_in'], cols]
+    
+    # A person returned after an event if their last attendance is later than it
+    def count_returned_later(per_event):
+        returned = per_event[per_event['last_attendance_datetime'] > per_event['start_datetime']]
+        return returned.groupby('event_id')['person_id'].nunique()
+    
+    retention_df = events.drop_duplicates('id')[['id', 'event_name', 'start_datetime', 'total_rsvps', 'total_attendees']].rename(
+        columns={'id': 'event_id', 'start_datetime': 'event_time'}
+    ).reset_index(drop=True)
+    
+    counts = {
+        'attendees_returned_later': count_returned_later(attended),
+        'rsvps_attended_later': count_returned_later(rsvped)
+    }
+    for col, per_event in counts.items():
+        retention_df[col] = retention_df['event_id'].map(per_event).fillna(0).astype(int)
     
-    for event_id in events['id'].unique():
-        event_rsvps = master[(master['event_id'] == event_id) & (master['rsvp'])]['person_id'].unique()
-        event_attendees = master[(master['event_id'] == event_id) & (master['checked_in'])]['person_id'].unique()
-        event_time = events[events['id'] == event_id]['start_datetime'].iloc[0]
-        event_name = events[events['id'] == event_id]['event_name'].iloc[0]
-        
-        # Count who returned to ANY later event (attendees)
-        later_attendances = master[
-            (master['person_id'].isin(event_attendees)) & 
-            (master['checked_in']) & 
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
-        
-        # Count RSVPs who attended a later event
-        rsvp_later_attended = master[
-            (master['person_id'].isin(event_rsvps)) & 
-            (master['checked_in']) & 
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
-        
-        retention_data.append({
-            'event_id': event_id,
-            'event_name': event_name,
-            'event_time': event_time,
-            'total_rsvps': len(event_rsvps),
-            'total_attendees': len(event_attendees),
-            'attendees_returned_later': len(later_attendances),
-            'rsvps_attended_later': len(rsvp_later_attended),
-            'retention_rate': len(later_attendances) / len(event_attendees) if len(event_attendees) > 0 else 0
-        })
-    
-    retention_df = pd.DataFrame(retention_data).sort_values('event_time')
+    retention_df['retention_rate'] = (
+        retention_df['attendees_returned_later'] / retention_df['total_attendees']
+    ).where(retention_df['total_attendees'] > 0, 0)
+    
+    retention_df = retention_df.sort_values('event_time')
     
     # Plot grouped bar chart with 4 bars
     fig, ax = plt.subplots(figsize=(16, 8))
@@ -123,7 +172,7 @@ def retention_analysis(master, events, outdir):
                        f'{int(height)}', ha='center', va='bottom', fontsize=7)
     
     plt.tight_layout()
-    plt.savefig(outdir / 'retention_by_event.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'retention_by_event.png', dpi=FIGURE_DPI, bbox_inches='tight', metadata=FIGURE_METADATA)
     plt.close()
     
     return retention_df
@@ -132,48 +181,29 @@ def new_members_analysis(master, events, outdir):
     """Analyze new attendees by event and category, including first-time RSVP tracking."""
     
     # New attendees by event (first attendances)
-    new_by_event = master[master['is_first_attendance']].groupby(['event_id', 'event_name']).size().reset_index(name='new_members')
-    
-    # Total unique RSVPs by event
-    total_rsvps_by_event = master[master['rsvp']].groupby(['event_id', 'event_name'])['person_id'].nunique().reset_index(name='total_rsvps')
+    new_by_event = master[master['is_first_attendance']].groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='new_members')
     
-    # Total unique attendees by event
-    total_by_event = master[master['checked_in']].groupby(['event_id', 'event_name'])['person_id'].nunique().reset_index(name='total_attendees')
+    # Total unique RSVPs and attendees by event
+    totals_by_event = events[['id', 'total_rsvps', 'total_attendees']].rename(columns={'id': 'event_id'})
     
     # First-time RSVPs (who didn't attend) by event
-    first_rsvp_no_attend = master[(master['is_first_rsvp']) & (~master['checked_in'])].groupby(['event_id', 'event_name']).agg({
-        'person_id': lambda x: x.unique().tolist()
-    }).reset_index()
-    first_rsvp_no_attend.columns = ['event_id', 'event_name', 'first_rsvp_people']
-    
-    # Check which first-time RSVPers returned later
-    first_rsvp_returns = []
-    for _, row in first_rsvp_no_attend.iterrows():
-        event_id = row['event_id']
-        event_time = events[events['id'] == event_id]['start_datetime'].iloc[0]
-        people = row['first_rsvp_people']
-        
-        returned_later = master[
-            (master['person_id'].isin(people)) & 
-            (master['checked_in']) & 
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
-        
-        first_rsvp_returns.append({
-            'event_id': event_id,
-            'event_name': row['event_name'],
-            'first_rsvp_no_attend': len(people),
-            'first_rsvp_returned': len(returned_later)
-        })
+    first_rsvp_no_attend = master.loc[
+        (master['is_first_rsvp']) & (~master['checked_in']),
+        ['person_id', 'event_id', 'event_name', 'start_datetime', 'last_attendance_datetime']
+    ]
     
-    first_rsvp_df = pd.DataFrame(first_rsvp_returns)
+    # Check which first-time RSVPers attended anything after the RSVP'd event
+    returned = first_rsvp_no_attend[first_rsvp_no_attend['last_attendance_datetime'] > first_rsvp_no_attend['start_datetime']]
+    
+    first_rsvp_df = first_rsvp_no_attend.groupby(['event_id', 'event_name'], observed=True)['person_id'].nunique().reset_index(name='first_rsvp_no_attend')
+    first_rsvp_returned = returned.groupby(['event_id', 'event_name'], observed=True)['person_id'].nunique().reset_index(name='first_rsvp_returned')
+    first_rsvp_df = first_rsvp_df.merge(first_rsvp_returned, on=['event_id', 'event_name'], how='left')
+    first_rsvp_df['first_rsvp_returned'] = first_rsvp_df['first_rsvp_returned'].fillna(0).astype(int)
     
     # Merge all data
-    new_members_df = new_by_event.merge(total_rsvps_by_event, on=['event_id', 'event_name'])
-    new_members_df = new_members_df.merge(total_by_event, on=['event_id', 'event_name'])
+    new_members_df = new_by_event.merge(totals_by_event, on='event_id')
     new_members_df = new_members_df.merge(first_rsvp_df, on=['event_id', 'event_name'], how='left')
-    new_members_df = new_members_df.fillna(0)
-    new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']] = new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']].astype(int)
+    new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']] = new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']].fillna(0).astype(int)
     
     # Sort by event time to show chronologically
     event_times = events[['id', 'start_datetime']].rename(columns={'id': 'event_id'})
@@ -207,70 +237,57 @@ def new_members_analysis(master, events, outdir):
                        f'{int(height)}', ha='center', va='bottom', fontsize=6)
     
     plt.tight_layout()
-    plt.savefig(outdir / 'new_members_by_event.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'new_members_by_event.png', dpi=FIGURE_DPI, bbox_inches='tight', metadata=FIGURE_METADATA)
     plt.close()
     
     # New attendees by category with RSVP tracking
-    category_stats = master[master['is_first_attendance']].groupby('category').agg({
+    category_stats = master[master['is_first_attendance']].groupby('category', observed=True).agg({
         'person_id': 'count'
     }).reset_index()
     category_stats.columns = ['category', 'new_members']  # Keep column name for consistency
     
-    # First RSVPs (no attend) by category
-    first_rsvp_cat = master[(master['is_first_rsvp']) & (~master['checked_in'])].copy()
-    
-    category_data = []
-    for category in master['category'].unique():
-        # First-time attendees
-        cat_first_timers = master[(master['is_first_attendance']) & (master['category'] == category)]['person_id'].unique()
-        
-        # First-time RSVPs (no show)
-        cat_first_rsvp = first_rsvp_cat[first_rsvp_cat['category'] == category]['person_id'].unique()
-        
-        # Count returns for attendees
-        attendee_returns = []
-        for person in cat_first_timers:
-            first_time = master[
-                (master['person_id'] == person) & 
-                (master['is_first_attendance'])
-            ]['start_datetime'].iloc[0]
-            
-            returns = master[
-                (master['person_id'] == person) & 
-                (master['checked_in']) & 
-                (master['start_datetime'] > first_time)
-            ].shape[0]
-            
-            attendee_returns.append(returns)
-        
-        # Count if RSVPers ever attended later
-        rsvp_returned_count = 0
-        for person in cat_first_rsvp:
-            first_rsvp_time = master[
-                (master['person_id'] == person) & 
-                (master['is_first_rsvp'])
-            ]['start_datetime'].iloc[0]
-            
-            later_attended = master[
-                (master['person_id'] == person) & 
-                (master['checked_in']) & 
-                (master['start_datetime'] > first_rsvp_time)
-            ].shape[0]
-            
-            if later_attended > 0:
-                rsvp_returned_count += 1
-        
-        category_data.append({
-            'category': category,
-            'new_members': len(cat_first_timers),  # Keep as new_members for consistency in variable names
-            'returned_1x': sum(1 for r in attendee_returns if r == 1),
-            'returned_2x': sum(1 for r in attendee_returns if r == 2),
-            'returned_3plus': sum(1 for r in attendee_returns if r >= 3),
-            'first_rsvp_no_show': len(cat_first_rsvp),
-            'first_rsvp_returned': rsvp_returned_count
-        })
-    
-    category_returns_df = pd.DataFrame(category_data).sort_values('new_members', ascending=False)
+    # Count later attendances per person relative to their first attendance
+    checked_in = master.loc[master['checked_in'], ['person_id', 'start_datetime']]
+    first_attendance_time = (
+        master.loc[master['is_first_attendance'], ['person_id', 'start_datetime']]
+        .drop_duplicates('person_id')
+        .set_index('person_id')['start_datetime']
+    )
+    
+    person_codes, person_ids = pd.factorize(checked_in['person_id'])
+    is_return = (checked_in['start_datetime'] > checked_in['person_id'].map(first_attendance_time)).to_numpy()
+    attendee_returns = pd.Series(
+        np.bincount(person_codes, weights=is_return, minlength=len(person_ids)).astype(int),
+        index=person_ids
+    )
+    
+    # First-time attendees per category, bucketed by how many times they returned
+    cat_first_timers = master.loc[master['is_first_attendance'], ['category', 'person_id']].drop_duplicates()
+    return_buckets = pd.cut(
+        cat_first_timers['person_id'].map(attendee_returns).fillna(0),
+        bins=[-1, 0, 1, 2, np.inf],
+        labels=['returned_0x', 'returned_1x', 'returned_2x', 'returned_3plus']
+    )
+    returns_by_cat = pd.crosstab(cat_first_timers['category'], return_buckets, dropna=False)
+    
+    # First-time RSVPs (no show) per category, and how many attended later
+    cat_first_rsvp = master.loc[(master['is_first_rsvp']) & (~master['checked_in']), ['category', 'person_id']].drop_duplicates()
+    cat_first_rsvp = cat_first_rsvp.assign(returned=cat_first_rsvp['person_id'].isin(returned['person_id']))
+    rsvp_by_cat = cat_first_rsvp.groupby('category', observed=True)['returned'].agg(['size', 'sum'])
+    
+    categories = pd.Index(master['category'].unique(), name='category')
+    returns_by_cat = returns_by_cat.reindex(categories, fill_value=0)
+    rsvp_by_cat = rsvp_by_cat.reindex(categories, fill_value=0)
+    
+    category_returns_df = pd.DataFrame({
+        'category': categories,
+        'new_members': returns_by_cat.sum(axis=1).to_numpy(),  # Keep as new_members for consistency in variable names
+        'returned_1x': returns_by_cat['returned_1x'].to_numpy(),
+        'returned_2x': returns_by_cat['returned_2x'].to_numpy(),
+        'returned_3plus': returns_by_cat['returned_3plus'].to_numpy(),
+        'first_rsvp_no_show': rsvp_by_cat['size'].to_numpy(),
+        'first_rsvp_returned': rsvp_by_cat['sum'].to_numpy()
+    }).sort_values('new_members', ascending=False)
     
     # Plot category returns with 6 bars
     fig, ax = plt.subplots(figsize=(14, 7))
@@ -293,77 +310,57 @@ def new_members_analysis(master, events, outdir):
     ax.legend(loc='upper right', ncol=2)
     
     plt.tight_layout()
-    plt.savefig(outdir / 'new_members_by_category.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'new_members_by_category.png', dpi=FIGURE_DPI, bbox_inches='tight', metadata=FIGURE_METADATA)
     plt.close()
     
     return new_members_df, category_returns_df
 
+def select_party_events(events):
+    """Return the events whose name contains one of the big-party keywords."""
+    
+    # Match each distinct event name once with a single regex scan, then
+    # select rows by category code
+    names = events['event_name'].cat.categories.astype(str).str.lower()
+    party_codes = np.flatnonzero(names.str.contains(PARTY_NAME_PATTERN))
+    
+    return events[np.isin(events['event_name'].cat.codes, party_codes)]
+
 def party_analysis(master, events, outdir):
     """Analyze the big parties specifically, including first-time RSVP patterns."""
     
     # Identify parties (case-insensitive matching)
-    party_names = ['launch', 'sababa nights', 'bsmnt', 'fall 2025']
-    party_events = []
-    
-    for _, event in events.iterrows():
-        event_name_lower = str(event['event_name']).lower()
-        for party_name in party_names:
-            if party_name in event_name_lower:
-                party_events.append(event['id'])
-                break
-    
-    party_data = []
-    for event_id in party_events:
-        event_info = events[events['id'] == event_id].iloc[0]
-        event_time = event_info['start_datetime']
-        
-        # Total RSVPs
-        total_rsvps = master[(master['event_id'] == event_id) & (master['rsvp'])]['person_id'].nunique()
-        
-        # Total attendees
-        total = master[(master['event_id'] == event_id) & (master['checked_in'])]['person_id'].nunique()
-        
-        # First-timers (attended)
-        first_timers = master[
-            (master['event_id'] == event_id) & 
-            (master['checked_in']) & 
-            (master['is_first_attendance'])
-        ]['person_id'].unique()
-        
-        # First-timers who returned
-        returned = master[
-            (master['person_id'].isin(first_timers)) & 
-            (master['checked_in']) & 
-            (master['start_datetime'] > event_time)
-        ]['person_id'].nunique()
-        
-        # First RSVPs (no show)
-        first_rsvp_no_show = master[
-            (master['event_id'] == event_id) & 
-            (master['is_first_rsvp']) & 
-            (~master['checked_in'])
-        ]['person_id'].unique()
-        
-        # First RSVPs who later attended
-        first_rsvp_returned = master[
-            (master['person_id'].isin(first_rsvp_no_show)) & 
-            (master['checked_in']) & 
-            (master['start_datetime'] > event_time)
-        ]['person_id'].nunique()
-        
-        party_data.append({
-            'event_name': event_info['event_name'],
-            'event_time': event_time,
-            'total_rsvps': total_rsvps,
-            'total_attendees': total,
-            'first_timers': len(first_timers),
-            'first_timers_returned': returned,
-            'first_rsvp_no_show': len(first_rsvp_no_show),
-            'first_rsvp_returned': first_rsvp_returned,
-            'retention_rate': returned / len(first_timers) if len(first_timers) > 0 else 0
-        })
-    
-    party_df = pd.DataFrame(party_data).sort_values('event_time')
+    party_events = select_party_events(events).drop_duplicates('id')
+    
+    # Pull every party row out of master in one pass, then count per event
+    party_rows = master.loc[
+        master['event_id'].isin(party_events['id']),
+        ['person_id', 'event_id', 'rsvp', 'checked_in', 'is_first_attendance', 'is_first_rsvp', 'start_datetime', 'last_attendance_datetime']
+    ]
+    returned_later = party_rows['last_attendance_datetime'] > party_rows['start_datetime']
+    is_first_timer = (party_rows['checked_in']) & (party_rows['is_first_attendance'])
+    is_first_rsvp_no_show = (party_rows['is_first_rsvp']) & (~party_rows['checked_in'])
+    
+    def count_people(mask):
+        return party_rows[mask].groupby('event_id')['person_id'].nunique()
+    
+    party_df = party_events[['id', 'event_name', 'start_datetime', 'total_rsvps', 'total_attendees']].rename(
+        columns={'id': 'event_id', 'start_datetime': 'event_time'}
+    ).reset_index(drop=True)
+    
+    counts = {
+        'first_timers': count_people(is_first_timer),
+        'first_timers_returned': count_people(is_first_timer & returned_later),
+        'first_rsvp_no_show': count_people(is_first_rsvp_no_show),
+        'first_rsvp_returned': count_people(is_first_rsvp_no_show & returned_later)
+    }
+    for col, per_event in counts.items():
+        party_df[col] = party_df['event_id'].map(per_event).fillna(0).astype(int)
+    
+    party_df['retention_rate'] = (
+        party_df['first_timers_returned'] / party_df['first_timers']
+    ).where(party_df['first_timers'] > 0, 0)
+    
+    party_df = party_df.drop(columns='event_id').sort_values('event_time')
     
     # Plot party funnel with 6 bars
     fig, ax = plt.subplots(figsize=(14, 7))
@@ -394,7 +391,7 @@ def party_analysis(master, events, outdir):
                        f'{int(height)}', ha='center', va='bottom', fontsize=8)
     
     plt.tight_layout()
-    plt.savefig(outdir / 'party_funnel.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'party_funnel.png', dpi=FIGURE_DPI, bbox_inches='tight', metadata=FIGURE_METADATA)
     plt.close()
     
     return party_df
@@ -404,28 +401,20 @@ def rsvp_conversion_analysis(master, outdir):
     
     # Version 1: All events
     # Get all people who ever RSVPed
-    rsvp_people = master[master['rsvp']]['person_id'].unique()
+    rsvp_people = master.loc[master['rsvp'], 'person_id'].unique()
     
-    # Count how many events each person attended
-    attendance_counts = []
-    for person in rsvp_people:
-        n_attended = master[
-            (master['person_id'] == person) & 
-            (master['checked_in'])
-        ]['event_id'].nunique()
-        attendance_counts.append(n_attended)
+    # Count how many events each person attended (0 for RSVPers who never checked in)
+    attended = master.loc[master['checked_in'], ['person_id', 'event_id', 'category']]
+    attendance_counts = attended.groupby('person_id')['event_id'].nunique().reindex(rsvp_people, fill_value=0)
     
-    # Create histogram data
-    max_count = max(attendance_counts) if attendance_counts else 0
-    hist_data = pd.Series(attendance_counts).value_counts().sort_index()
+    # Create histogram data (bar height for every count from 0 to the max)
+    y = np.bincount(attendance_counts.to_numpy(dtype=np.int64), minlength=1)
+    x = np.arange(len(y))
     
     # Plot histogram - ALL events
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
     # First subplot: All events
-    x = list(range(0, max_count + 1))
-    y = [hist_data.get(i, 0) for i in x]
-    
     bars1 = ax1.bar(x, y, color='steelblue', edgecolor='black')
     
     # Add value labels on bars
@@ -436,7 +425,7 @@ def rsvp_conversion_analysis(master, outdir):
     
     ax1.set_xlabel('Number of Events Attended')
     ax1.set_ylabel('Number of People')
-    ax1.set_title(f'RSVP to Attendance (All Events)\n{len(rsvp_people):,} Unique RSVPs | {sum(1 for c in attendance_counts if c > 0):,} Unique Attendees')
+    ax1.set_title(f'RSVP to Attendance (All Events)\n{len(rsvp_people):,} Unique RSVPs | {(attendance_counts > 0).sum():,} Unique Attendees')
     ax1.set_xticks(x)
     
     # Add explanatory text
@@ -448,26 +437,18 @@ def rsvp_conversion_analysis(master, outdir):
     
     # Version 2: Excluding party category
     # Get all people who RSVPed to non-party events
-    non_party_rsvps = master[(master['rsvp']) & (master['category'] != 'party')]
+    non_party_rsvps = master.loc[(master['rsvp']) & (master['category'] != 'party'), ['person_id']]
     rsvp_people_no_party = non_party_rsvps['person_id'].unique()
     
     # Count how many non-party events each person attended
-    attendance_counts_no_party = []
-    for person in rsvp_people_no_party:
-        n_attended = master[
-            (master['person_id'] == person) & 
-            (master['checked_in']) & 
-            (master['category'] != 'party')
-        ]['event_id'].nunique()
-        attendance_counts_no_party.append(n_attended)
+    attended_no_party = attended[attended['category'] != 'party']
+    attendance_counts_no_party = attended_no_party.groupby('person_id')['event_id'].nunique().reindex(rsvp_people_no_party, fill_value=0)
     
     # Create histogram data for non-party
-    max_count_no_party = max(attendance_counts_no_party) if attendance_counts_no_party else 0
-    hist_data_no_party = pd.Series(attendance_counts_no_party).value_counts().sort_index()
+    y2 = np.bincount(attendance_counts_no_party.to_numpy(dtype=np.int64), minlength=1)
+    x2 = np.arange(len(y2))
     
     # Second subplot: Excluding parties
-    x2 = list(range(0, max_count_no_party + 1))
-    y2 = [hist_data_no_party.get(i, 0) for i in x2]
     
     bars2 = ax2.bar(x2, y2, color='darkgreen', edgecolor='black')
     
@@ -479,7 +460,7 @@ def rsvp_conversion_analysis(master, outdir):
     
     ax2.set_xlabel('Number of Events Attended')
     ax2.set_ylabel('Number of People')
-    ax2.set_title(f'RSVP to Attendance (Excluding Parties)\n{len(rsvp_people_no_party):,} Unique RSVPs | {sum(1 for c in attendance_counts_no_party if c > 0):,} Unique Attendees')
+    ax2.set_title(f'RSVP to Attendance (Excluding Parties)\n{len(rsvp_people_no_party):,} Unique RSVPs | {(attendance_counts_no_party > 0).sum():,} Unique Attendees')
     ax2.set_xticks(x2)
     
     # Add explanatory text
@@ -490,7 +471,7 @@ def rsvp_conversion_analysis(master, outdir):
            bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.8))
     
     plt.tight_layout()
-    plt.savefig(outdir / 'rsvp_conversion.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'rsvp_conversion.png', dpi=FIGURE_DPI, bbox_inches='tight', metadata=FIGURE_METADATA)
     plt.close()
     
     # Return summary stats for all events
@@ -543,6 +524,7 @@ def main():
     parser.add_argument('--events', default='final/events.csv', help='Path to events CSV')
     parser.add_argument('--people', default='final/people.csv', help='Path to people CSV')
     parser.add_argument('--outdir', default='analysis_outputs', help='Output directory')
+    parser.add_argument('--no-cache', action='store_true', help='Rebuild the master dataset even if a cached copy exists')
     args = parser.parse_args()
     
     # Create output directory
@@ -550,35 +532,46 @@ def main():
     outdir.mkdir(parents=True, exist_ok=True)
     
     print("Loading and merging data...")
-    master, events = create_master_dataset(args.attendance, args.events, args.people)
+    if args.no_cache:
+        master, events = create_master_dataset(args.attendance, args.events, args.people)
+    else:
+        master, events = load_master_dataset(args.attendance, args.events, args.people, outdir / '.cache')
     
     print(f"Master dataset created: {len(master)} rows, {master['person_id'].nunique()} unique people, {master['event_id'].nunique()} events")
     
     print("\nRunning analyses...")
     
-    # 1. Retention analysis
-    print("1. Analyzing retention by event...")
-    retention_df = retention_analysis(master, events, outdir)
-    
-    # 2. New attendees analysis
-    print("2. Analyzing new attendees...")
-    new_by_event, new_by_category = new_members_analysis(master, events, outdir)
-    
-    # 3. Party analysis
-    print("3. Analyzing big parties...")
-    party_df = party_analysis(master, events, outdir)
-    
-    # 4. RSVP conversion (two versions)
-    print("4. Analyzing RSVP conversion...")
-    conversion_stats = rsvp_conversion_analysis(master, outdir)
-    
-    # 5. Generate summary stats
-    print("5. Generating summary statistics...")
-    summary_stats = generate_summary_stats(master, outdir)
+    # The charting analyses only read master/events, so render them in
+    # parallel worker processes
+    with ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1)) as executor:
+        # 1. Retention analysis
+        print("1. Analyzing retention by event...")
+        retention_future = executor.submit(retention_analysis, master, events, outdir)
+        
+        # 2. New attendees analysis
+        print("2. Analyzing new attendees...")
+        new_members_future = executor.submit(new_members_analysis, master, events, outdir)
+        
+        # 3. Party analysis
+        print("3. Analyzing big parties...")
+        party_future = executor.submit(party_analysis, master, events, outdir)
+        
+        # 4. RSVP conversion (two versions)
+        print("4. Analyzing RSVP conversion...")
+        conversion_future = executor.submit(rsvp_conversion_analysis, master, outdir)
+        
+        # 5. Generate summary stats
+        print("5. Generating summary statistics...")
+        summary_stats = generate_summary_stats(master, outdir)
+        
+        retention_df = retention_future.result()
+        new_by_event, new_by_category = new_members_future.result()
+        party_df = party_future.result()
+        conversion_stats = conversion_future.result()
     
     print(f"\n✅ Analysis complete! All outputs saved to: {outdir.resolve()}")
     print("\nGenerated files:")
-    for file in sorted(outdir.glob('*')):
+    for file in sorted(f for f in outdir.glob('*') if f.is_file()):
         print(f"  - {file.name}")
 
 if __name__ == '__main__':
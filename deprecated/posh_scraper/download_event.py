@@ -231,8 +231,13 @@ def sanitize_filename(filename):
     safe_chars = '-_.'
     return "".join(c if c.isalnum() or c in safe_chars else '_' for c in filename)
 
-def main():
+def run():
+    """Interactively pick and download one event report.
+
+    Returns the path of the CSV saved to Raw/, or None if nothing was downloaded.
+    """
     driver = None
+    new_path = None
     try:
         print("Starting Posh VIP Event Downloader...")
         print(f"Target URL: {EVENTS_URL}")
@@ -296,7 +301,6 @@ def main():
 
                 os.rename(downloaded_file, new_path)
                 print(f"\n✓ Success! File saved to: {new_path}")
-                print(f"OUTPUT_FILE:{new_path}")  # Marker for orchestrator script
 
                 break
             else:
@@ -309,6 +313,7 @@ def main():
         print(f"\n✗ Error occurred: {e}")
         import traceback
         traceback.print_exc()
+        new_path = None
 
     finally:
         # Note: We intentionally don't close Chrome (driver.quit())
@@ -317,5 +322,10 @@ def main():
             print("\n✓ Disconnecting from browser (Chrome will stay open)...")
         print("Done!")
 
+    return str(new_path) if new_path else None
+
+def main():
+    run()
+
 if __name__ == "__main__":
     main()
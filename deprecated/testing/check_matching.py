@@ -31,23 +31,47 @@ def main():
 
     print("=== CHECKING DATABASE FOR MATCHING CANDIDATES ===\n")
 
+    # Look up exact name matches (and their phone contacts) for every test case
+    # in one query instead of one per person
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT p.id, p.first_name, p.last_name, c.id AS contact_id, c.contact_value
+            FROM People p
+            LEFT JOIN Contacts c ON c.person_id = p.id AND c.contact_type = 'phone'
+            WHERE (LOWER(p.first_name), LOWER(p.last_name)) IN (
+                SELECT * FROM unnest(%s::text[], %s::text[])
+            )
+            ORDER BY p.id, c.id
+        """, ([t[0].lower() for t in test_cases], [t[1].lower() for t in test_cases]))
+        rows = cur.fetchall()
+
+    name_matches_by_case = {}
+    for row in rows:
+        key = (row['first_name'].lower(), row['last_name'].lower())
+        people = name_matches_by_case.setdefault(key, {})
+        person = people.setdefault(row['id'], {
+            'id': row['id'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'phones': []
+        })
+        if row['contact_id'] is not None:
+            person['phones'].append((row['contact_id'], row['contact_value']))
+
     for first, last, email, phone in test_cases:
         print(f"\n--- Checking: {first} {last} ---")
         print(f"    Email: {email}")
         print(f"    Phone: {phone}")
 
         # Check exact name match
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT * FROM People WHERE LOWER(first_name) = %s AND LOWER(last_name) = %s",
-                (first.lower(), last.lower())
-            )
-            name_matches = cur.fetchall()
+        name_matches = list(name_matches_by_case.get((first.lower(), last.lower()), {}).values())
 
         if name_matches:
             print(f"    ✓ Found {len(name_matches)} exact name match(es)")
             for match in name_matches:
                 print(f"      - ID: {match['id']}, Name: {match['first_name']} {match['last_name']}")
+                for contact_id, contact_value in match['phones']:
+                    print(f"        Contact ID {contact_id}: phone = '{contact_value}'")
         else:
             print(f"    ✗ No exact name matches")
 
@@ -85,7 +109,10 @@ def main():
     print("\n\n=== CHECKING FOR SIMILAR NAMES (FUZZY MATCHES) ===\n")
 
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT id, first_name, last_name FROM People WHERE LOWER(first_name) LIKE 'rohan%' OR LOWER(first_name) LIKE 'gideon%' OR LOWER(first_name) LIKE 'garrick%'")
+        cur.execute(
+            "SELECT id, first_name, last_name FROM People WHERE LOWER(first_name) LIKE ANY(%s)",
+            (['rohan%', 'gideon%', 'garrick%'],)
+        )
         similar = cur.fetchall()
 
     if similar:
@@ -28,24 +28,60 @@ print("=== TABLES IN DATABASE ===")
 print(", ".join(tables))
 print("\n")
 
-# For each table, get its schema
+# Fetch column and constraint info for every table up front (two round trips
+# total instead of two per table), then group the rows by table name
+cursor.execute("""
+    SELECT
+        table_name,
+        column_name,
+        data_type,
+        character_maximum_length,
+        is_nullable,
+        column_default
+    FROM information_schema.columns
+    WHERE table_schema = 'public'
+    AND table_name = ANY(%s)
+    ORDER BY table_name, ordinal_position;
+""", (tables,))
+
+columns_by_table = {table: [] for table in tables}
+for row in cursor.fetchall():
+    columns_by_table[row[0]].append(row[1:])
+
+cursor.execute("""
+    SELECT
+        tc.table_name,
+        tc.constraint_name,
+        tc.constraint_type,
+        kcu.column_name,
+        ccu.table_name AS foreign_table_name,
+        ccu.column_name AS foreign_column_name,
+        rc.update_rule,
+        rc.delete_rule
+    FROM information_schema.table_constraints AS tc
+    LEFT JOIN information_schema.key_column_usage AS kcu
+        ON tc.constraint_name = kcu.constraint_name
+        AND tc.table_schema = kcu.table_schema
+    LEFT JOIN information_schema.constraint_column_usage AS ccu
+        ON ccu.constraint_name = tc.constraint_name
+        AND ccu.table_schema = tc.table_schema
+    LEFT JOIN information_schema.referential_constraints AS rc
+        ON tc.constraint_name = rc.constraint_name
+        AND tc.table_schema = rc.constraint_schema
+    WHERE tc.table_name = ANY(%s)
+    AND tc.table_schema = 'public'
+    ORDER BY tc.table_name, tc.constraint_type, tc.constraint_name;
+""", (tables,))
+
+constraints_by_table = {table: [] for table in tables}
+for row in cursor.fetchall():
+    constraints_by_table[row[0]].append(row[1:])
+
+# For each table, print its schema
 for table in tables:
     print(f"=== TABLE: {table} ===")
 
-    # Get column information
-    cursor.execute(f"""
-        SELECT
-            column_name,
-            data_type,
-            character_maximum_length,
-            is_nullable,
-            column_default
-        FROM information_schema.columns
-        WHERE table_name = '{table}'
-        ORDER BY ordinal_position;
-    """)
-
-    columns = cursor.fetchall()
+    columns = columns_by_table[table]
     for col in columns:
         col_name, data_type, max_len, nullable, default = col
 
@@ -60,32 +96,7 @@ for table in tables:
 
         print(f"  {col_name}: {type_str} {null_str}{default_str}")
 
-    # Get constraints
-    cursor.execute(f"""
-        SELECT
-            tc.constraint_name,
-            tc.constraint_type,
-            kcu.column_name,
-            ccu.table_name AS foreign_table_name,
-            ccu.column_name AS foreign_column_name,
-            rc.update_rule,
-            rc.delete_rule
-        FROM information_schema.table_constraints AS tc
-        LEFT JOIN information_schema.key_column_usage AS kcu
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-        LEFT JOIN information_schema.constraint_column_usage AS ccu
-            ON ccu.constraint_name = tc.constraint_name
-            AND ccu.table_schema = tc.table_schema
-        LEFT JOIN information_schema.referential_constraints AS rc
-            ON tc.constraint_name = rc.constraint_name
-            AND tc.table_schema = rc.constraint_schema
-        WHERE tc.table_name = '{table}'
-        AND tc.table_schema = 'public'
-        ORDER BY tc.constraint_type, tc.constraint_name;
-    """)
-
-    constraints = cursor.fetchall()
+    constraints = constraints_by_table[table]
     if constraints:
         print("\n  CONSTRAINTS:")
         for constraint in constraints:
@@ -31,6 +31,12 @@ def main():
             ORDER BY ordinal_position
         """)
         columns = cur.fetchall()
+        # contact_value's type is fixed by the schema, so look it up here once
+        # instead of calling pg_typeof() on every row below
+        value_type = next(
+            (col['data_type'] for col in columns if col['column_name'] == 'contact_value'),
+            None
+        )
         for col in columns:
             print(f"   {col['column_name']}: {col['data_type']}", end='')
             if col['character_maximum_length']:
@@ -42,8 +48,7 @@ def main():
     print("\n2. Phone numbers containing '.0':")
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
-            SELECT person_id, contact_type, contact_value,
-                   pg_typeof(contact_value) as value_type
+            SELECT person_id, contact_type, contact_value
             FROM Contacts
             WHERE contact_type = 'phone'
               AND contact_value LIKE '%.0%'
@@ -53,7 +58,7 @@ def main():
 
         if phones_with_decimals:
             for p in phones_with_decimals:
-                print(f"   Person {p['person_id']}: '{p['contact_value']}' (type: {p['value_type']})")
+                print(f"   Person {p['person_id']}: '{p['contact_value']}' (type: {value_type})")
         else:
             print("   None found")
 
@@ -75,24 +80,8 @@ def main():
         else:
             print("   None found")
 
-    # Check Gideon's contacts specifically
-    print("\n4. Gideon Bialkin's phone numbers:")
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("""
-            SELECT c.contact_type, c.contact_value, c.id
-            FROM Contacts c
-            JOIN People p ON c.person_id = p.id
-            WHERE LOWER(p.first_name) = 'gideon'
-              AND LOWER(p.last_name) = 'bialkin'
-              AND c.contact_type = 'phone'
-        """)
-        gideon_phones = cur.fetchall()
-
-        for p in gideon_phones:
-            print(f"   Contact ID {p['id']}: {p['contact_type']} = '{p['contact_value']}'")
-
     # Count total phones with issues
-    print("\n5. Summary:")
+    print("\n4. Summary:")
     with conn.cursor() as cur:
         cur.execute("SELECT COUNT(*) FROM Contacts WHERE contact_type = 'phone'")
         total_phones = cur.fetchone()[0]
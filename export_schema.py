@@ -5,18 +5,47 @@ This creates a schema.sql file that tracks the current state of all tables.
 
 Usage:
     python export_schema.py
+    python export_schema.py --pg-dump
     
 The script will connect to Railway using credentials from .env and export
-the complete schema to schema.sql in the project root.
+the complete schema to schema.sql in the project root. With --pg-dump the
+schema body comes from `pg_dump --schema-only` instead, which also covers
+objects the built-in generator skips (sequences, views, functions, partial
+index details); pg_dump must be installed and match the server's major version.
 """
 
+import argparse
 import psycopg2
 import os
+import re
+import subprocess
+from collections import defaultdict
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# information_schema data_type -> DDL type name for types that need no
+# length/precision handling
+TYPE_MAP = {
+    'integer': 'INTEGER',
+    'bigint': 'BIGINT',
+    'smallint': 'SMALLINT',
+    'boolean': 'BOOLEAN',
+    'text': 'TEXT',
+    'timestamp without time zone': 'TIMESTAMP',
+    'timestamp with time zone': 'TIMESTAMPTZ',
+    'date': 'DATE',
+    'time without time zone': 'TIME',
+    'json': 'JSON',
+    'jsonb': 'JSONB',
+    'uuid': 'UUID',
+    'numeric': 'NUMERIC',
+}
+
+# Where a pg_get_constraintdef FOREIGN KEY definition is broken onto new lines
+FK_CLAUSE_BREAK = re.compile(r' (REFERENCES|ON DELETE|ON UPDATE) ')
+
 
 def connect_to_db():
     """Connect to the Railway PostgreSQL database."""
@@ -25,7 +54,14 @@ def connect_to_db():
         port=os.getenv('PGPORT'),
         database=os.getenv('PGDATABASE'),
         user=os.getenv('PGUSER'),
-        password=os.getenv('PGPASSWORD')
+        password=os.getenv('PGPASSWORD'),
+        # Fail fast on a stalled Railway link and cap runaway queries at 60s
+        connect_timeout=10,
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=5,
+        options='-c statement_timeout=60000'
     )
 
 
@@ -41,10 +77,19 @@ def get_tables(cursor):
     return [row[0] for row in cursor.fetchall()]
 
 
-def get_columns(cursor, table_name):
-    """Get column definitions for a table."""
-    cursor.execute(f"""
+def group_by_table(rows):
+    """Group (table_name, *values) rows into {table_name: [values, ...]}, keeping row order."""
+    grouped = defaultdict(list)
+    for table_name, *values in rows:
+        grouped[table_name].append(tuple(values))
+    return grouped
+
+
+def fetch_all_columns(cursor):
+    """Get column definitions for every table, keyed by table name."""
+    cursor.execute("""
         SELECT 
+            table_name,
             column_name,
             data_type,
             character_maximum_length,
@@ -54,86 +99,58 @@ def get_columns(cursor, table_name):
             column_default,
             udt_name
         FROM information_schema.columns
-        WHERE table_name = %s
-        AND table_schema = 'public'
-        ORDER BY ordinal_position;
-    """, (table_name,))
-    return cursor.fetchall()
-
+        WHERE table_schema = 'public'
+        ORDER BY table_name, ordinal_position;
+    """)
+    return group_by_table(cursor.fetchall())
 
-def get_primary_key(cursor, table_name):
-    """Get primary key columns for a table."""
-    cursor.execute("""
-        SELECT kcu.column_name
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu 
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-        WHERE tc.table_name = %s
-        AND tc.constraint_type = 'PRIMARY KEY'
-        AND tc.table_schema = 'public'
-        ORDER BY kcu.ordinal_position;
-    """, (table_name,))
-    return [row[0] for row in cursor.fetchall()]
 
+def fetch_all_constraints(cursor):
+    """
+    Get primary key, foreign key, unique, and check constraints for every table
+    with one pg_constraint scan.
 
-def get_foreign_keys(cursor, table_name):
-    """Get foreign key constraints for a table."""
+    Returns {contype: {table_name: [(constraint_name, columns, definition), ...]}},
+    where contype is 'p', 'f', 'u', or 'c' and definition is the DDL fragment
+    from pg_get_constraintdef.
+    """
     cursor.execute("""
         SELECT
-            tc.constraint_name,
-            kcu.column_name,
-            ccu.table_name AS foreign_table,
-            ccu.column_name AS foreign_column,
-            rc.delete_rule,
-            rc.update_rule
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-        JOIN information_schema.constraint_column_usage ccu
-            ON ccu.constraint_name = tc.constraint_name
-            AND ccu.table_schema = tc.table_schema
-        JOIN information_schema.referential_constraints rc
-            ON tc.constraint_name = rc.constraint_name
-            AND tc.table_schema = rc.constraint_schema
-        WHERE tc.table_name = %s
-        AND tc.constraint_type = 'FOREIGN KEY'
-        AND tc.table_schema = 'public';
-    """, (table_name,))
-    return cursor.fetchall()
-
-
-def get_unique_constraints(cursor, table_name):
-    """Get unique constraints for a table."""
-    cursor.execute("""
-        SELECT tc.constraint_name, string_agg(kcu.column_name, ', ' ORDER BY kcu.ordinal_position)
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-        WHERE tc.table_name = %s
-        AND tc.constraint_type = 'UNIQUE'
-        AND tc.table_schema = 'public'
-        GROUP BY tc.constraint_name;
-    """, (table_name,))
-    return cursor.fetchall()
-
-
-def get_check_constraints(cursor, table_name):
-    """Get check constraints for a table."""
-    cursor.execute("""
-        SELECT cc.constraint_name, cc.check_clause
-        FROM information_schema.check_constraints cc
-        JOIN information_schema.table_constraints tc
-            ON cc.constraint_name = tc.constraint_name
-            AND cc.constraint_schema = tc.table_schema
-        WHERE tc.table_name = %s
-        AND tc.table_schema = 'public'
-        AND tc.constraint_type = 'CHECK'
-        AND cc.constraint_name NOT LIKE '%%_not_null';
-    """, (table_name,))
-    return cursor.fetchall()
+            con.contype,
+            c.relname AS table_name,
+            con.conname,
+            ARRAY(
+                SELECT a.attname
+                FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a
+                    ON a.attrelid = con.conrelid
+                    AND a.attnum = k.attnum
+                ORDER BY k.ord
+            ) AS columns,
+            pg_get_constraintdef(con.oid) AS definition
+        FROM pg_constraint con
+        JOIN pg_class c ON con.conrelid = c.oid
+        JOIN pg_namespace n ON c.relnamespace = n.oid
+        WHERE n.nspname = 'public'
+        AND con.contype IN ('p', 'f', 'u', 'c')
+        ORDER BY c.relname, con.oid;
+    """)
+    constraints = {contype: defaultdict(list) for contype in 'pfuc'}
+    for contype, table_name, conname, columns, definition in cursor.fetchall():
+        constraints[contype][table_name].append((conname, columns, definition))
+    return constraints
+
+
+def fetch_schema_metadata(cursor):
+    """Fetch column and constraint metadata for the whole schema in two queries."""
+    constraints = fetch_all_constraints(cursor)
+    return {
+        'columns': fetch_all_columns(cursor),
+        'primary_keys': {table: pks[0][1] for table, pks in constraints['p'].items()},
+        'foreign_keys': constraints['f'],
+        'unique_constraints': constraints['u'],
+        'check_constraints': constraints['c'],
+    }
 
 
 def format_column_type(col):
@@ -170,114 +187,75 @@ def format_column_type(col):
         return f"NUMERIC({num_precision})"
     
     # Map common types
-    type_map = {
-        'integer': 'INTEGER',
-        'bigint': 'BIGINT',
-        'smallint': 'SMALLINT',
-        'boolean': 'BOOLEAN',
-        'text': 'TEXT',
-        'timestamp without time zone': 'TIMESTAMP',
-        'timestamp with time zone': 'TIMESTAMPTZ',
-        'date': 'DATE',
-        'time without time zone': 'TIME',
-        'json': 'JSON',
-        'jsonb': 'JSONB',
-        'uuid': 'UUID',
-        'numeric': 'NUMERIC',
-    }
-    
-    return type_map.get(data_type, data_type.upper())
+    return TYPE_MAP.get(data_type, data_type.upper())
 
 
-def generate_create_table(cursor, table_name):
-    """Generate CREATE TABLE statement for a table."""
-    columns = get_columns(cursor, table_name)
-    pk_cols = get_primary_key(cursor, table_name)
-    fks = get_foreign_keys(cursor, table_name)
-    uniques = get_unique_constraints(cursor, table_name)
-    checks = get_check_constraints(cursor, table_name)
+def generate_create_table(table_name, metadata):
+    """Generate CREATE TABLE statement for a table from fetch_schema_metadata() output."""
+    columns = metadata['columns'].get(table_name, [])
+    pk_cols = metadata['primary_keys'].get(table_name, [])
+    fks = metadata['foreign_keys'].get(table_name, [])
+    uniques = metadata['unique_constraints'].get(table_name, [])
+    checks = metadata['check_constraints'].get(table_name, [])
     
-    lines = [f"CREATE TABLE IF NOT EXISTS {table_name} ("]
+    # A single-column primary key is declared inline on its column
+    inline_pk = pk_cols[0] if len(pk_cols) == 1 else None
     col_defs = []
     
     for col in columns:
         col_name, data_type, char_max_len, num_precision, num_scale, is_nullable, default, udt_name = col
-        
         col_type = format_column_type(col)
+        is_serial = 'SERIAL' in col_type
         
-        # Build column definition
-        col_def = f"    {col_name} {col_type}"
-        
-        # Add NOT NULL (skip for SERIAL types which are auto NOT NULL)
-        if is_nullable == 'NO' and 'SERIAL' not in col_type:
-            col_def += " NOT NULL"
-        
-        # Add DEFAULT (skip for SERIAL types)
-        if default and 'nextval' not in str(default) and 'SERIAL' not in col_type:
-            col_def += f" DEFAULT {default}"
+        # NOT NULL and DEFAULT are implied for SERIAL types
+        not_null = is_nullable == 'NO' and not is_serial
+        has_default = default and 'nextval' not in str(default) and not is_serial
         
-        col_defs.append(col_def)
+        col_defs.append(
+            f"    {col_name} {col_type}"
+            f"{' NOT NULL' if not_null else ''}"
+            f"{f' DEFAULT {default}' if has_default else ''}"
+            f"{' PRIMARY KEY' if col_name == inline_pk else ''}"
+        )
     
-    # Add PRIMARY KEY constraint
-    if pk_cols:
-        if len(pk_cols) == 1:
-            # Find and modify the column definition to include PRIMARY KEY
-            for i, col_def in enumerate(col_defs):
-                if col_def.strip().startswith(pk_cols[0] + ' '):
-                    col_defs[i] += " PRIMARY KEY"
-                    break
-        else:
-            col_defs.append(f"    PRIMARY KEY ({', '.join(pk_cols)})")
+    # Add a composite PRIMARY KEY constraint
+    if len(pk_cols) > 1:
+        col_defs.append(f"    PRIMARY KEY ({', '.join(pk_cols)})")
     
-    # Add UNIQUE constraints
-    for constraint_name, cols in uniques:
-        col_defs.append(f"    UNIQUE ({cols})")
+    # Add UNIQUE and CHECK constraints (pg_get_constraintdef gives the DDL)
+    col_defs.extend(f"    {definition}" for constraint_name, cols, definition in uniques + checks)
     
-    # Add CHECK constraints
-    for constraint_name, check_clause in checks:
-        col_defs.append(f"    CHECK {check_clause}")
+    # Add FOREIGN KEY constraints, one clause per line
+    for constraint_name, cols, definition in fks:
+        definition = FK_CLAUSE_BREAK.sub(r'\n        \1 ', definition)
+        col_defs.append(f"    CONSTRAINT {constraint_name}\n        {definition}")
     
-    # Add FOREIGN KEY constraints
-    for fk in fks:
-        constraint_name, col, foreign_table, foreign_col, delete_rule, update_rule = fk
-        fk_def = f"    CONSTRAINT {constraint_name}\n        FOREIGN KEY ({col})\n        REFERENCES {foreign_table}({foreign_col})"
-        if delete_rule and delete_rule != 'NO ACTION':
-            fk_def += f"\n        ON DELETE {delete_rule}"
-        if update_rule and update_rule != 'NO ACTION':
-            fk_def += f"\n        ON UPDATE {update_rule}"
-        col_defs.append(fk_def)
-    
-    lines.append(',\n'.join(col_defs))
-    lines.append(");")
-    
-    return '\n'.join(lines)
+    body = ',\n'.join(col_defs)
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{body}\n);"
 
 
-def get_indexes(cursor, table_name):
-    """Get non-primary/non-unique indexes for a table."""
+def fetch_all_indexes(cursor):
+    """Get non-primary/non-unique indexes for every table, keyed by table name, in creation order."""
     cursor.execute("""
-        SELECT indexname, indexdef
-        FROM pg_indexes
-        WHERE tablename = %s
-        AND schemaname = 'public'
-        AND indexdef NOT LIKE '%%UNIQUE%%'
-        AND indexname NOT LIKE '%%_pkey';
-    """, (table_name,))
-    return cursor.fetchall()
+        SELECT
+            t.relname AS table_name,
+            i.relname AS index_name,
+            pg_get_indexdef(i.oid) AS index_def
+        FROM pg_index x
+        JOIN pg_class t ON x.indrelid = t.oid
+        JOIN pg_class i ON x.indexrelid = i.oid
+        JOIN pg_namespace n ON t.relnamespace = n.oid
+        WHERE n.nspname = 'public'
+        AND NOT x.indisunique
+        AND NOT x.indisprimary
+        ORDER BY t.relname, i.oid;
+    """)
+    return group_by_table(cursor.fetchall())
 
 
-def export_schema():
-    """Export the complete database schema to schema.sql."""
-    print("Connecting to Railway database...")
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    print("✅ Connected successfully!")
-    
-    tables = get_tables(cursor)
-    print(f"Found {len(tables)} tables: {', '.join(tables)}")
-    
-    # Build schema content
-    schema_lines = [
+def schema_header():
+    """Comment lines identifying the database and export time."""
+    return [
         f"-- Railway Database Schema",
         f"-- Exported on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
         f"-- Database: {os.getenv('PGDATABASE')}",
@@ -288,29 +266,61 @@ def export_schema():
         "",
         ""
     ]
+
+
+def export_schema_with_pg_dump():
+    """Export the public schema to schema.sql using pg_dump --schema-only."""
+    schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
     
-    # Generate CREATE TABLE for each table
-    for table in tables:
-        schema_lines.append(f"-- ============================================")
-        schema_lines.append(f"-- TABLE: {table}")
-        schema_lines.append(f"-- ============================================")
-        schema_lines.append("")
-        schema_lines.append(generate_create_table(cursor, table))
-        
-        # Add indexes
-        indexes = get_indexes(cursor, table)
-        if indexes:
-            schema_lines.append("")
-            for idx_name, idx_def in indexes:
-                schema_lines.append(f"{idx_def};")
-        
-        schema_lines.append("")
-        schema_lines.append("")
+    # pg_dump reads the same PG* connection variables that load_dotenv() set
+    print("Running pg_dump against Railway database...")
+    with open(schema_path, 'w') as f:
+        f.write('\n'.join(schema_header()))
+        f.flush()
+        subprocess.run(
+            ['pg_dump', '--schema-only', '--no-owner', '--no-privileges', '--schema=public'],
+            stdout=f,
+            check=True
+        )
+    
+    print(f"\n✅ Schema exported to: {schema_path}")
+
+
+def export_schema():
+    """Export the complete database schema to schema.sql."""
+    print("Connecting to Railway database...")
+    conn = connect_to_db()
+    cursor = conn.cursor()
+    print("✅ Connected successfully!")
     
-    # Write to file
+    tables = get_tables(cursor)
+    print(f"Found {len(tables)} tables: {', '.join(tables)}")
+    metadata = fetch_schema_metadata(cursor)
+    indexes_by_table = fetch_all_indexes(cursor)
+    
+    # Write the header, then each table as it is generated
     schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
     with open(schema_path, 'w') as f:
-        f.write('\n'.join(schema_lines))
+        f.write('\n'.join(schema_header()))
+        
+        for table in tables:
+            table_lines = [
+                "",
+                f"-- ============================================",
+                f"-- TABLE: {table}",
+                f"-- ============================================",
+                "",
+                generate_create_table(table, metadata),
+            ]
+            
+            # Add indexes
+            indexes = indexes_by_table.get(table, [])
+            if indexes:
+                table_lines.append("")
+                table_lines.extend(f"{idx_def};" for idx_name, idx_def in indexes)
+            
+            table_lines.extend(["", ""])
+            f.write('\n'.join(table_lines))
     
     print(f"\n✅ Schema exported to: {schema_path}")
     print(f"   Total tables: {len(tables)}")
@@ -320,4 +330,11 @@ def export_schema():
 
 
 if __name__ == '__main__':
-    export_schema()
+    parser = argparse.ArgumentParser(description='Export the Railway database schema to schema.sql')
+    parser.add_argument('--pg-dump', action='store_true', help='Generate the schema with pg_dump --schema-only')
+    args = parser.parse_args()
+    
+    if args.pg_dump:
+        export_schema_with_pg_dump()
+    else:
+        export_schema()
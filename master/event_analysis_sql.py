@@ -11,22 +11,50 @@ This is the database version of event_analysis.py
 """
 
 import argparse
+import hashlib
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # charts are rendered in worker processes, never shown
 import matplotlib.pyplot as plt
 import psycopg2
 import os
 from dotenv import load_dotenv
 
-def load_data_from_db():
-    """Load data from PostgreSQL database instead of CSV files."""
+# Chart rendering defaults. Figures use constrained_layout, so savefig needs
+# no bbox_inches='tight' re-render to find the bounds
+plt.rcParams.update({
+    'figure.dpi': 100,
+    'savefig.dpi': 120,
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000
+})
+
+# Big parties are identified by these keywords in the event name
+PARTY_NAMES = ['launch', 'sababa nights', 'bsmnt', 'fall 2025']
+PARTY_NAME_PATTERN = re.compile('|'.join(re.escape(name) for name in PARTY_NAMES))
+
+# Server-side digest of every column the analyses read; it changes whenever
+# a row they depend on is inserted, updated, or deleted
+SOURCE_FINGERPRINT_QUERY = """
+    SELECT
+        (SELECT md5(string_agg(concat_ws('|', id, person_id, event_id, rsvp, approved, checked_in, rsvp_datetime), ',' ORDER BY id)) FROM attendance),
+        (SELECT md5(string_agg(concat_ws('|', id, event_name, category, start_datetime), ',' ORDER BY id)) FROM events),
+        (SELECT md5(string_agg(concat_ws('|', id, gender, is_jewish), ',' ORDER BY id)) FROM people)
+"""
+
+def connect_to_db():
+    """Open a connection to the Railway database using the PG* environment variables."""
 
     # Load environment variables
     load_dotenv()
 
     # Connect to Railway database
-    conn = psycopg2.connect(
+    return psycopg2.connect(
         host=os.getenv('PGHOST'),
         port=os.getenv('PGPORT'),
         database=os.getenv('PGDATABASE'),
@@ -34,8 +62,16 @@ def load_data_from_db():
         password=os.getenv('PGPASSWORD')
     )
 
+def load_data_from_db():
+    """Load data from PostgreSQL database instead of CSV files."""
+
+    conn = connect_to_db()
+
     print("Connected to Railway database")
 
+    # Each query selects only the columns the analyses use, and read_sql
+    # applies the final dtypes as it builds the frame
+
     # Load attendance data
     print("Loading attendance data...")
     attendance_query = """
@@ -46,42 +82,41 @@ def load_data_from_db():
             rsvp,
             approved,
             checked_in,
-            rsvp_datetime,
-            is_first_event,
-            invite_token_id
+            rsvp_datetime
         FROM attendance
         ORDER BY rsvp_datetime
     """
-    attendance = pd.read_sql(attendance_query, conn)
+    attendance = pd.read_sql(
+        attendance_query, conn,
+        parse_dates={'rsvp_datetime': {'errors': 'coerce'}},
+        dtype={'rsvp': 'bool', 'checked_in': 'bool', 'approved': 'int8'}
+    )
 
-    # Load events data
+    # Load events data (repeated strings become categoricals, which the
+    # merges in create_master_dataset_from_db carry into master)
     print("Loading events data...")
     events_query = """
         SELECT
             id,
             event_name,
             category,
-            location,
-            start_datetime,
-            description
+            start_datetime
         FROM events
         ORDER BY start_datetime
     """
-    events = pd.read_sql(events_query, conn)
+    events = pd.read_sql(
+        events_query, conn,
+        parse_dates={'start_datetime': {'errors': 'coerce'}},
+        dtype={'event_name': 'category', 'category': 'category'}
+    )
 
     # Load people data
     print("Loading people data...")
     people_query = """
         SELECT
             id,
-            first_name,
-            last_name,
-            preferred_name,
             gender,
-            class_year,
-            is_jewish,
-            school,
-            additional_info
+            is_jewish
         FROM people
     """
     people = pd.read_sql(people_query, conn)
@@ -92,20 +127,15 @@ def load_data_from_db():
     return attendance, events, people
 
 def create_master_dataset_from_db():
-    """Load data from database and merge into a single master dataset."""
+    """Load data from database and merge into a single master dataset.
+
+    Returns (master, events, attended, rsvped), where attended and rsvped are
+    the checked-in and RSVP rows of master.
+    """
 
     # Load data from database
     attendance, events, people = load_data_from_db()
 
-    # Parse datetime columns
-    attendance['rsvp_datetime'] = pd.to_datetime(attendance['rsvp_datetime'], errors='coerce')
-    events['start_datetime'] = pd.to_datetime(events['start_datetime'], errors='coerce')
-
-    # Convert boolean columns (they should already be boolean from postgres, but ensure)
-    attendance['rsvp'] = attendance['rsvp'].astype(bool)
-    attendance['checked_in'] = attendance['checked_in'].astype(bool)
-    attendance['approved'] = attendance['approved'].astype(int)
-
     # For is_jewish, convert from boolean to 'J'/'N' format for compatibility
     # The CSV version uses 'J'/'N', but database uses boolean
     people['is_jewish'] = people['is_jewish'].apply(lambda x: 'J' if x == True else ('N' if x == False else None))
@@ -114,71 +144,98 @@ def create_master_dataset_from_db():
     master = attendance.merge(events, left_on='event_id', right_on='id', suffixes=('', '_event'))
     master = master.merge(people, left_on='person_id', right_on='id', suffixes=('', '_person'))
 
-    # Calculate first attendance (checked_in = True) per person
-    first_attendance = master[master['checked_in']].groupby('person_id').agg({
-        'event_id': 'first',
-        'start_datetime': 'min'
-    }).reset_index()
-    first_attendance.columns = ['person_id', 'first_attendance_event_id', 'first_attendance_datetime']
-
-    # Calculate first RSVP per person
-    first_rsvp = master[master['rsvp']].groupby('person_id').agg({
-        'event_id': 'first',
-        'start_datetime': 'min'
-    }).reset_index()
-    first_rsvp.columns = ['person_id', 'first_rsvp_event_id', 'first_rsvp_datetime']
-
-    # Add first attendance and RSVP info to master
-    master = master.merge(first_attendance, on='person_id', how='left')
-    master = master.merge(first_rsvp, on='person_id', how='left')
-
-    # Add flags
-    master['is_first_attendance'] = (master['event_id'] == master['first_attendance_event_id'])
-    master['is_first_rsvp'] = (master['event_id'] == master['first_rsvp_event_id'])
-
-    return master, events
-
-def retention_analysis(master, events, outdir):
+    # Add first attendance (checked_in = True) and first RSVP info per person.
+    # The time is the earliest start among those rows, broadcast back with
+    # transform. The flag marks the person's first row of that kind directly;
+    # attendance is unique on (person_id, event_id), so that row is the only
+    # one for their first event
+    for prefix, mask in [('first_attendance', master['checked_in']), ('first_rsvp', master['rsvp'])]:
+        master[f'{prefix}_datetime'] = master['start_datetime'].where(mask).groupby(master['person_id'], sort=False).transform('min')
+        first_rows = master.loc[mask, 'person_id'].drop_duplicates().index
+        master[f'is_{prefix}'] = master.index.isin(first_rows)
+
+    # Keep each person's rows together in time order (after the first-row
+    # flags, which depend on load order), so person-keyed groupbys and
+    # scans walk contiguous runs
+    master = master.sort_values(['person_id', 'start_datetime'], kind='mergesort').reset_index(drop=True)
+
+    # Every analysis filters to checked-in or RSVP rows, so slice those once
+    attended = master.loc[master['checked_in']].copy()
+    rsvped = master.loc[master['rsvp']].copy()
+
+    return master, events, attended, rsvped
+
+def load_master_dataset(cache_dir):
+    """Return create_master_dataset_from_db()'s frames, reusing a cached copy if the source rows are unchanged."""
+
+    # Key the cache on a digest of the source tables, so only a few hashes
+    # cross the network when nothing has changed
+    conn = connect_to_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SOURCE_FINGERPRINT_QUERY)
+            fingerprint = cur.fetchone()
+    finally:
+        conn.close()
+    cache_key = hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:16]
+    cache_path = cache_dir / f'master_{cache_key}.pkl'
+
+    if cache_path.exists():
+        print(f"Using cached master dataset: {cache_path}")
+        return pd.read_pickle(cache_path)
+
+    frames = create_master_dataset_from_db()
+
+    # Drop caches for older data, then save this one
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob('master_*.pkl'):
+        stale.unlink()
+    pd.to_pickle(frames, cache_path)
+
+    return frames
+
+def retention_analysis(attended, rsvped, events, outdir):
     """Analyze retention by event including RSVPs."""
 
     # Get attendees and RSVPs per event and who returned later
-    retention_data = []
-
-    for event_id in events['id'].unique():
-        event_rsvps = master[(master['event_id'] == event_id) & (master['rsvp'])]['person_id'].unique()
-        event_attendees = master[(master['event_id'] == event_id) & (master['checked_in'])]['person_id'].unique()
-        event_time = events[events['id'] == event_id]['start_datetime'].iloc[0]
-        event_name = events[events['id'] == event_id]['event_name'].iloc[0]
-
-        # Count who returned to ANY later event (attendees)
-        later_attendances = master[
-            (master['person_id'].isin(event_attendees)) &
-            (master['checked_in']) &
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
+    attend = attended[['person_id', 'event_id', 'start_datetime']]
+    rsvps = rsvped[['person_id', 'event_id', 'start_datetime']]
+
+    # Someone returned after an event if their latest attendance is later than it
+    last_attendance = attend.groupby('person_id', sort=False)['start_datetime'].max()
+
+    def count_per_event(frame):
+        """Unique people per event, and how many of them attended a later event."""
+        pairs = frame.drop_duplicates(['person_id', 'event_id'])
+        codes, event_ids = pd.factorize(pairs['event_id'])
+        returned = (pairs['person_id'].map(last_attendance) > pairs['start_datetime']).to_numpy()
+        total = np.bincount(codes, minlength=len(event_ids))
+        later = np.bincount(codes, weights=returned, minlength=len(event_ids)).astype(int)
+        return pd.Series(total, index=event_ids), pd.Series(later, index=event_ids)
+
+    total_rsvps, rsvps_attended_later = count_per_event(rsvps)
+    total_attendees, attendees_returned_later = count_per_event(attend)
+    counts = {
+        'total_rsvps': total_rsvps,
+        'total_attendees': total_attendees,
+        'attendees_returned_later': attendees_returned_later,
+        'rsvps_attended_later': rsvps_attended_later
+    }
 
-        # Count RSVPs who attended a later event
-        rsvp_later_attended = master[
-            (master['person_id'].isin(event_rsvps)) &
-            (master['checked_in']) &
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
+    retention_df = events.drop_duplicates('id')[['id', 'event_name', 'start_datetime']].rename(
+        columns={'id': 'event_id', 'start_datetime': 'event_time'}
+    ).reset_index(drop=True)
+    for col, per_event in counts.items():
+        retention_df[col] = retention_df['event_id'].map(per_event).fillna(0).astype(int)
 
-        retention_data.append({
-            'event_id': event_id,
-            'event_name': event_name,
-            'event_time': event_time,
-            'total_rsvps': len(event_rsvps),
-            'total_attendees': len(event_attendees),
-            'attendees_returned_later': len(later_attendances),
-            'rsvps_attended_later': len(rsvp_later_attended),
-            'retention_rate': len(later_attendances) / len(event_attendees) if len(event_attendees) > 0 else 0
-        })
+    retention_df['retention_rate'] = (
+        retention_df['attendees_returned_later'] / retention_df['total_attendees']
+    ).where(retention_df['total_attendees'] > 0, 0)
 
-    retention_df = pd.DataFrame(retention_data).sort_values('event_time')
+    retention_df = retention_df.sort_values('event_time')
 
     # Plot grouped bar chart with 4 bars
-    fig, ax = plt.subplots(figsize=(16, 8))
+    fig, ax = plt.subplots(figsize=(16, 8), constrained_layout=True)
     x = np.arange(len(retention_df))
     width = 0.2
 
@@ -196,64 +253,45 @@ def retention_analysis(master, events, outdir):
 
     # Add value labels on bars
     for bars in [bars1, bars2, bars3, bars4]:
-        for bar in bars:
-            height = bar.get_height()
-            if height > 0:
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom', fontsize=7)
-
-    plt.tight_layout()
-    plt.savefig(outdir / 'retention_by_event.png', dpi=150, bbox_inches='tight')
+        ax.bar_label(bars, labels=[f'{int(h)}' if h > 0 else '' for h in bars.datavalues], fontsize=7)
+
+    plt.savefig(outdir / 'retention_by_event.png')
     plt.close()
 
     return retention_df
 
-def new_members_analysis(master, events, outdir):
+def new_members_analysis(master, attended, rsvped, events, outdir):
     """Analyze new attendees by event and category, including first-time RSVP tracking."""
 
     # New attendees by event (first attendances)
-    new_by_event = master[master['is_first_attendance']].groupby(['event_id', 'event_name']).size().reset_index(name='new_members')
+    new_by_event = master[master['is_first_attendance']].groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='new_members')
 
     # Total unique RSVPs by event
-    total_rsvps_by_event = master[master['rsvp']].groupby(['event_id', 'event_name'])['person_id'].nunique().reset_index(name='total_rsvps')
+    total_rsvps_by_event = rsvped[['event_id', 'event_name', 'person_id']].drop_duplicates().groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='total_rsvps')
 
     # Total unique attendees by event
-    total_by_event = master[master['checked_in']].groupby(['event_id', 'event_name'])['person_id'].nunique().reset_index(name='total_attendees')
+    total_by_event = attended[['event_id', 'event_name', 'person_id']].drop_duplicates().groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='total_attendees')
 
     # First-time RSVPs (who didn't attend) by event
-    first_rsvp_no_attend = master[(master['is_first_rsvp']) & (~master['checked_in'])].groupby(['event_id', 'event_name']).agg({
-        'person_id': lambda x: x.unique().tolist()
-    }).reset_index()
-    first_rsvp_no_attend.columns = ['event_id', 'event_name', 'first_rsvp_people']
-
-    # Check which first-time RSVPers returned later
-    first_rsvp_returns = []
-    for _, row in first_rsvp_no_attend.iterrows():
-        event_id = row['event_id']
-        event_time = events[events['id'] == event_id]['start_datetime'].iloc[0]
-        people = row['first_rsvp_people']
-
-        returned_later = master[
-            (master['person_id'].isin(people)) &
-            (master['checked_in']) &
-            (master['start_datetime'] > event_time)
-        ]['person_id'].unique()
+    first_rsvp_no_attend = master.loc[
+        (master['is_first_rsvp']) & (~master['checked_in']),
+        ['person_id', 'event_id', 'event_name', 'start_datetime']
+    ]
 
-        first_rsvp_returns.append({
-            'event_id': event_id,
-            'event_name': row['event_name'],
-            'first_rsvp_no_attend': len(people),
-            'first_rsvp_returned': len(returned_later)
-        })
+    # Check which first-time RSVPers attended anything after the RSVP'd event
+    last_attendance = attended.groupby('person_id', sort=False)['start_datetime'].max()
+    returned = first_rsvp_no_attend[first_rsvp_no_attend['person_id'].map(last_attendance) > first_rsvp_no_attend['start_datetime']]
 
-    first_rsvp_df = pd.DataFrame(first_rsvp_returns)
+    first_rsvp_df = first_rsvp_no_attend[['event_id', 'event_name', 'person_id']].drop_duplicates().groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='first_rsvp_no_attend')
+    first_rsvp_returned = returned[['event_id', 'event_name', 'person_id']].drop_duplicates().groupby(['event_id', 'event_name'], observed=True).size().reset_index(name='first_rsvp_returned')
+    first_rsvp_df = first_rsvp_df.merge(first_rsvp_returned, on=['event_id', 'event_name'], how='left')
+    first_rsvp_df['first_rsvp_returned'] = first_rsvp_df['first_rsvp_returned'].fillna(0)
 
     # Merge all data
     new_members_df = new_by_event.merge(total_rsvps_by_event, on=['event_id', 'event_name'])
     new_members_df = new_members_df.merge(total_by_event, on=['event_id', 'event_name'])
     new_members_df = new_members_df.merge(first_rsvp_df, on=['event_id', 'event_name'], how='left')
-    new_members_df = new_members_df.fillna(0)
-    new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']] = new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']].astype(int)
+    new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']] = new_members_df[['first_rsvp_no_attend', 'first_rsvp_returned']].fillna(0).astype(int)
 
     # Sort by event time to show chronologically
     event_times = events[['id', 'start_datetime']].rename(columns={'id': 'event_id'})
@@ -261,7 +299,7 @@ def new_members_analysis(master, events, outdir):
     new_members_df = new_members_df.sort_values('start_datetime')
 
     # Plot ALL events with 5 bars
-    fig, ax = plt.subplots(figsize=(18, 8))
+    fig, ax = plt.subplots(figsize=(18, 8), constrained_layout=True)
     x = np.arange(len(new_members_df))
     width = 0.16
 
@@ -280,80 +318,62 @@ def new_members_analysis(master, events, outdir):
 
     # Add value labels (only for bars > 0 to avoid clutter)
     for bars in [bars1, bars2, bars3, bars4, bars5]:
-        for bar in bars:
-            height = bar.get_height()
-            if height > 0:
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom', fontsize=6)
-
-    plt.tight_layout()
-    plt.savefig(outdir / 'new_members_by_event.png', dpi=150, bbox_inches='tight')
+        ax.bar_label(bars, labels=[f'{int(h)}' if h > 0 else '' for h in bars.datavalues], fontsize=6)
+
+    plt.savefig(outdir / 'new_members_by_event.png')
     plt.close()
 
     # New attendees by category with RSVP tracking
-    category_stats = master[master['is_first_attendance']].groupby('category').agg({
+    category_stats = master[master['is_first_attendance']].groupby('category', observed=True).agg({
         'person_id': 'count'
     }).reset_index()
     category_stats.columns = ['category', 'new_members']  # Keep column name for consistency
 
-    # First RSVPs (no attend) by category
-    first_rsvp_cat = master[(master['is_first_rsvp']) & (~master['checked_in'])].copy()
-
-    category_data = []
-    for category in master['category'].unique():
-        # First-time attendees
-        cat_first_timers = master[(master['is_first_attendance']) & (master['category'] == category)]['person_id'].unique()
-
-        # First-time RSVPs (no show)
-        cat_first_rsvp = first_rsvp_cat[first_rsvp_cat['category'] == category]['person_id'].unique()
-
-        # Count returns for attendees
-        attendee_returns = []
-        for person in cat_first_timers:
-            first_time = master[
-                (master['person_id'] == person) &
-                (master['is_first_attendance'])
-            ]['start_datetime'].iloc[0]
-
-            returns = master[
-                (master['person_id'] == person) &
-                (master['checked_in']) &
-                (master['start_datetime'] > first_time)
-            ].shape[0]
-
-            attendee_returns.append(returns)
-
-        # Count if RSVPers ever attended later
-        rsvp_returned_count = 0
-        for person in cat_first_rsvp:
-            first_rsvp_time = master[
-                (master['person_id'] == person) &
-                (master['is_first_rsvp'])
-            ]['start_datetime'].iloc[0]
-
-            later_attended = master[
-                (master['person_id'] == person) &
-                (master['checked_in']) &
-                (master['start_datetime'] > first_rsvp_time)
-            ].shape[0]
-
-            if later_attended > 0:
-                rsvp_returned_count += 1
-
-        category_data.append({
-            'category': category,
-            'new_members': len(cat_first_timers),  # Keep as new_members for consistency in variable names
-            'returned_1x': sum(1 for r in attendee_returns if r == 1),
-            'returned_2x': sum(1 for r in attendee_returns if r == 2),
-            'returned_3plus': sum(1 for r in attendee_returns if r >= 3),
-            'first_rsvp_no_show': len(cat_first_rsvp),
-            'first_rsvp_returned': rsvp_returned_count
-        })
+    # Each person's first attendance time and first RSVP time
+    first_att_time = master.loc[master['is_first_attendance'], ['person_id', 'start_datetime']].drop_duplicates('person_id').set_index('person_id')['start_datetime']
+    first_rsvp_time = master.loc[master['is_first_rsvp'], ['person_id', 'start_datetime']].drop_duplicates('person_id').set_index('person_id')['start_datetime']
+
+    # Count each person's attendances after their first attendance / first RSVP
+    attend = attended[['person_id', 'start_datetime']]
+    returns_after_first_att = attend[attend['start_datetime'] > attend['person_id'].map(first_att_time)].groupby('person_id', sort=False).size()
+    returns_after_first_rsvp = attend[attend['start_datetime'] > attend['person_id'].map(first_rsvp_time)].groupby('person_id', sort=False).size()
+
+    # First-time attendees per category, bucketed by number of returns
+    # (0, 1, 2, 3+) with one bincount over category code x bucket
+    cat_first_timers = master.loc[master['is_first_attendance'], ['category', 'person_id']].drop_duplicates()
+    cat_first_timers = cat_first_timers[cat_first_timers['category'].notna()]
+    n_returns = cat_first_timers['person_id'].map(returns_after_first_att).fillna(0).to_numpy(dtype=np.int64)
+    cat_codes = cat_first_timers['category'].cat.codes.to_numpy(dtype=np.int64)
+    cat_index = pd.Index(cat_first_timers['category'].cat.categories, name='category')
+    buckets = np.bincount(cat_codes * 4 + np.minimum(n_returns, 3), minlength=len(cat_index) * 4).reshape(-1, 4)
+    attendee_counts = pd.DataFrame({
+        'new_members': buckets.sum(axis=1),
+        'returned_1x': buckets[:, 1],
+        'returned_2x': buckets[:, 2],
+        'returned_3plus': buckets[:, 3]
+    }, index=cat_index)
+
+    # First-time RSVPs (no show) per category, and whether they attended later
+    cat_first_rsvp = master.loc[(master['is_first_rsvp']) & (~master['checked_in']), ['category', 'person_id']].drop_duplicates()
+    cat_first_rsvp = cat_first_rsvp.assign(
+        first_rsvp_no_show=1,
+        first_rsvp_returned=cat_first_rsvp['person_id'].isin(returns_after_first_rsvp.index).astype(int)
+    )
 
-    category_returns_df = pd.DataFrame(category_data).sort_values('new_members', ascending=False)
+    categories = pd.Index(master['category'].unique(), name='category')
+    rsvp_counts = cat_first_rsvp.groupby('category', observed=True)[['first_rsvp_no_show', 'first_rsvp_returned']].sum()
+
+    category_returns_df = (
+        attendee_counts.join(rsvp_counts, how='outer')
+        .reindex(categories, fill_value=0)
+        .fillna(0)
+        .astype(int)
+        .reset_index()
+        .sort_values('new_members', ascending=False)
+    )
 
     # Plot category returns with 6 bars
-    fig, ax = plt.subplots(figsize=(14, 7))
+    fig, ax = plt.subplots(figsize=(14, 7), constrained_layout=True)
     categories = category_returns_df['category']
     x = np.arange(len(categories))
     width = 0.14
@@ -372,50 +392,44 @@ def new_members_analysis(master, events, outdir):
     ax.set_xticklabels(categories, rotation=45, ha='right')
     ax.legend(loc='upper right', ncol=2)
 
-    plt.tight_layout()
-    plt.savefig(outdir / 'new_members_by_category.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'new_members_by_category.png')
     plt.close()
 
     return new_members_df, category_returns_df
 
-def party_analysis(master, events, outdir):
+def party_analysis(master, attended, rsvped, events, outdir):
     """Analyze the big parties specifically, including first-time RSVP patterns."""
 
     # Identify parties (case-insensitive matching)
-    party_names = ['launch', 'sababa nights', 'bsmnt', 'fall 2025']
-    party_events = []
+    party_mask = events['event_name'].str.lower().str.contains(PARTY_NAME_PATTERN, na=False)
+    party_events = events.loc[party_mask, 'id'].tolist()
 
-    for _, event in events.iterrows():
-        event_name_lower = str(event['event_name']).lower()
-        for party_name in party_names:
-            if party_name in event_name_lower:
-                party_events.append(event['id'])
-                break
+    # Event lookups by id (first row wins, as with the filtered .iloc[0])
+    unique_events = events.drop_duplicates('id')
+    event_times = dict(zip(unique_events['id'], unique_events['start_datetime']))
+    event_names = dict(zip(unique_events['id'], unique_events['event_name']))
+
+    # Someone returned after a party if their latest attendance is later than it
+    last_attendance = attended.groupby('person_id', sort=False)['start_datetime'].max()
 
     party_data = []
     for event_id in party_events:
-        event_info = events[events['id'] == event_id].iloc[0]
-        event_time = event_info['start_datetime']
+        event_time = event_times[event_id]
 
         # Total RSVPs
-        total_rsvps = master[(master['event_id'] == event_id) & (master['rsvp'])]['person_id'].nunique()
+        total_rsvps = rsvped[rsvped['event_id'] == event_id]['person_id'].nunique()
 
         # Total attendees
-        total = master[(master['event_id'] == event_id) & (master['checked_in'])]['person_id'].nunique()
+        total = attended[attended['event_id'] == event_id]['person_id'].nunique()
 
         # First-timers (attended)
-        first_timers = master[
-            (master['event_id'] == event_id) &
-            (master['checked_in']) &
-            (master['is_first_attendance'])
+        first_timers = attended[
+            (attended['event_id'] == event_id) &
+            (attended['is_first_attendance'])
         ]['person_id'].unique()
 
         # First-timers who returned
-        returned = master[
-            (master['person_id'].isin(first_timers)) &
-            (master['checked_in']) &
-            (master['start_datetime'] > event_time)
-        ]['person_id'].nunique()
+        returned = (last_attendance.reindex(first_timers) > event_time).sum()
 
         # First RSVPs (no show)
         first_rsvp_no_show = master[
@@ -425,14 +439,10 @@ def party_analysis(master, events, outdir):
         ]['person_id'].unique()
 
         # First RSVPs who later attended
-        first_rsvp_returned = master[
-            (master['person_id'].isin(first_rsvp_no_show)) &
-            (master['checked_in']) &
-            (master['start_datetime'] > event_time)
-        ]['person_id'].nunique()
+        first_rsvp_returned = (last_attendance.reindex(first_rsvp_no_show) > event_time).sum()
 
         party_data.append({
-            'event_name': event_info['event_name'],
+            'event_name': event_names[event_id],
             'event_time': event_time,
             'total_rsvps': total_rsvps,
             'total_attendees': total,
@@ -446,7 +456,7 @@ def party_analysis(master, events, outdir):
     party_df = pd.DataFrame(party_data).sort_values('event_time')
 
     # Plot party funnel with 6 bars
-    fig, ax = plt.subplots(figsize=(14, 7))
+    fig, ax = plt.subplots(figsize=(14, 7), constrained_layout=True)
     parties = party_df['event_name']
     x = np.arange(len(parties))
     width = 0.14
@@ -467,56 +477,40 @@ def party_analysis(master, events, outdir):
 
     # Add value labels
     for bars in [bars1, bars2, bars3, bars4, bars5, bars6]:
-        for bar in bars:
-            height = bar.get_height()
-            if height > 0:
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom', fontsize=8)
-
-    plt.tight_layout()
-    plt.savefig(outdir / 'party_funnel.png', dpi=150, bbox_inches='tight')
+        ax.bar_label(bars, labels=[f'{int(h)}' if h > 0 else '' for h in bars.datavalues], fontsize=8)
+
+    plt.savefig(outdir / 'party_funnel.png')
     plt.close()
 
     return party_df
 
-def rsvp_conversion_analysis(master, outdir):
+def rsvp_conversion_analysis(attended, rsvped, outdir):
     """Analyze RSVP to attendance conversion - both overall and excluding parties."""
 
     # Version 1: All events
     # Get all people who ever RSVPed
-    rsvp_people = master[master['rsvp']]['person_id'].unique()
+    rsvp_people = rsvped['person_id'].unique()
 
-    # Count how many events each person attended
-    attendance_counts = []
-    for person in rsvp_people:
-        n_attended = master[
-            (master['person_id'] == person) &
-            (master['checked_in'])
-        ]['event_id'].nunique()
-        attendance_counts.append(n_attended)
+    # Count how many events each person attended (0 for RSVPers who never checked in)
+    attendance_counts = attended.groupby('person_id', sort=False)['event_id'].nunique().reindex(rsvp_people, fill_value=0)
 
-    # Create histogram data
-    max_count = max(attendance_counts) if attendance_counts else 0
-    hist_data = pd.Series(attendance_counts).value_counts().sort_index()
+    # Create histogram data (bar height for every count from 0 to the max)
+    y = np.bincount(attendance_counts.to_numpy(dtype=np.int64), minlength=1)
+    x = np.arange(len(y))
 
     # Plot histogram - ALL events
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6), constrained_layout=True)
 
     # First subplot: All events
-    x = list(range(0, max_count + 1))
-    y = [hist_data.get(i, 0) for i in x]
 
     bars1 = ax1.bar(x, y, color='steelblue', edgecolor='black')
 
     # Add value labels on bars
-    for bar, val in zip(bars1, y):
-        if val > 0:
-            ax1.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
-                   f'{int(val)}', ha='center', va='bottom')
+    ax1.bar_label(bars1, labels=[f'{int(val)}' if val > 0 else '' for val in y])
 
     ax1.set_xlabel('Number of Events Attended')
     ax1.set_ylabel('Number of People')
-    ax1.set_title(f'RSVP to Attendance (All Events)\n{len(rsvp_people):,} Unique RSVPs | {sum(1 for c in attendance_counts if c > 0):,} Unique Attendees')
+    ax1.set_title(f'RSVP to Attendance (All Events)\n{len(rsvp_people):,} Unique RSVPs | {(attendance_counts > 0).sum():,} Unique Attendees')
     ax1.set_xticks(x)
 
     # Add explanatory text
@@ -528,38 +522,27 @@ def rsvp_conversion_analysis(master, outdir):
 
     # Version 2: Excluding party category
     # Get all people who RSVPed to non-party events
-    non_party_rsvps = master[(master['rsvp']) & (master['category'] != 'party')]
+    non_party_rsvps = rsvped[rsvped['category'] != 'party']
     rsvp_people_no_party = non_party_rsvps['person_id'].unique()
 
     # Count how many non-party events each person attended
-    attendance_counts_no_party = []
-    for person in rsvp_people_no_party:
-        n_attended = master[
-            (master['person_id'] == person) &
-            (master['checked_in']) &
-            (master['category'] != 'party')
-        ]['event_id'].nunique()
-        attendance_counts_no_party.append(n_attended)
+    attended_no_party = attended[attended['category'] != 'party']
+    attendance_counts_no_party = attended_no_party.groupby('person_id', sort=False)['event_id'].nunique().reindex(rsvp_people_no_party, fill_value=0)
 
     # Create histogram data for non-party
-    max_count_no_party = max(attendance_counts_no_party) if attendance_counts_no_party else 0
-    hist_data_no_party = pd.Series(attendance_counts_no_party).value_counts().sort_index()
+    y2 = np.bincount(attendance_counts_no_party.to_numpy(dtype=np.int64), minlength=1)
+    x2 = np.arange(len(y2))
 
     # Second subplot: Excluding parties
-    x2 = list(range(0, max_count_no_party + 1))
-    y2 = [hist_data_no_party.get(i, 0) for i in x2]
 
     bars2 = ax2.bar(x2, y2, color='darkgreen', edgecolor='black')
 
     # Add value labels on bars
-    for bar, val in zip(bars2, y2):
-        if val > 0:
-            ax2.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
-                   f'{int(val)}', ha='center', va='bottom')
+    ax2.bar_label(bars2, labels=[f'{int(val)}' if val > 0 else '' for val in y2])
 
     ax2.set_xlabel('Number of Events Attended')
     ax2.set_ylabel('Number of People')
-    ax2.set_title(f'RSVP to Attendance (Excluding Parties)\n{len(rsvp_people_no_party):,} Unique RSVPs | {sum(1 for c in attendance_counts_no_party if c > 0):,} Unique Attendees')
+    ax2.set_title(f'RSVP to Attendance (Excluding Parties)\n{len(rsvp_people_no_party):,} Unique RSVPs | {(attendance_counts_no_party > 0).sum():,} Unique Attendees')
     ax2.set_xticks(x2)
 
     # Add explanatory text
@@ -569,8 +552,7 @@ def rsvp_conversion_analysis(master, outdir):
            verticalalignment='top',
            bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.8))
 
-    plt.tight_layout()
-    plt.savefig(outdir / 'rsvp_conversion.png', dpi=150, bbox_inches='tight')
+    plt.savefig(outdir / 'rsvp_conversion.png')
     plt.close()
 
     # Return summary stats for all events
@@ -581,22 +563,27 @@ def rsvp_conversion_analysis(master, outdir):
 
     return conversion_stats
 
-def generate_summary_stats(master, outdir):
+def generate_summary_stats(master, attended, outdir):
     """Generate overall summary statistics."""
 
+    # Row totals and per-person "ever RSVPed / ever attended" flags in one pass each
+    totals = master[['rsvp', 'checked_in']].sum()
+    per_person = master.groupby('person_id', sort=False)[['rsvp', 'checked_in']].any()
+    unique_people = per_person.sum()
+
     stats = {
-        'Total Unique People': master['person_id'].nunique(),
+        'Total Unique People': len(per_person),
         'Total Events': master['event_id'].nunique(),
-        'Total RSVPs': master[master['rsvp']].shape[0],
-        'Total Attendances': master[master['checked_in']].shape[0],
-        'Unique People Who RSVPed': master[master['rsvp']]['person_id'].nunique(),
-        'Unique People Who Attended': master[master['checked_in']]['person_id'].nunique(),
-        'Overall RSVP→Attendance Rate': master[master['checked_in']].shape[0] / master[master['rsvp']].shape[0] if master[master['rsvp']].shape[0] > 0 else 0,
-        'Avg Events per Attendee': master[master['checked_in']].groupby('person_id')['event_id'].nunique().mean()
+        'Total RSVPs': totals['rsvp'],
+        'Total Attendances': totals['checked_in'],
+        'Unique People Who RSVPed': unique_people['rsvp'],
+        'Unique People Who Attended': unique_people['checked_in'],
+        'Overall RSVP→Attendance Rate': totals['checked_in'] / totals['rsvp'] if totals['rsvp'] > 0 else 0,
+        'Avg Events per Attendee': attended.groupby('person_id', sort=False)['event_id'].nunique().mean()
     }
 
     # Demographics of attendees
-    attendees = master[master['checked_in']].drop_duplicates('person_id')
+    attendees = attended.drop_duplicates('person_id')
     stats['% Jewish Attendees'] = (attendees['is_jewish'] == 'J').mean() * 100 if 'is_jewish' in attendees.columns else None
     stats['% Female Attendees'] = (attendees['gender'] == 'F').mean() * 100 if 'gender' in attendees.columns else None
 
@@ -620,6 +607,7 @@ def generate_summary_stats(master, outdir):
 def main():
     parser = argparse.ArgumentParser(description='Event Analytics Script (SQL Version)')
     parser.add_argument('--outdir', default='analysis_outputs', help='Output directory')
+    parser.add_argument('--no-cache', action='store_true', help='Rebuild the master dataset even if a cached copy exists')
     args = parser.parse_args()
 
     # Create output directory
@@ -627,35 +615,46 @@ def main():
     outdir.mkdir(parents=True, exist_ok=True)
 
     print("Loading and merging data from Railway database...")
-    master, events = create_master_dataset_from_db()
+    if args.no_cache:
+        master, events, attended, rsvped = create_master_dataset_from_db()
+    else:
+        master, events, attended, rsvped = load_master_dataset(outdir / '.cache')
 
     print(f"Master dataset created: {len(master)} rows, {master['person_id'].nunique()} unique people, {master['event_id'].nunique()} events")
 
     print("\nRunning analyses...")
 
-    # 1. Retention analysis
-    print("1. Analyzing retention by event...")
-    retention_df = retention_analysis(master, events, outdir)
+    # The charting analyses only read the master frames, so render them in
+    # parallel worker processes
+    with ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1)) as executor:
+        # 1. Retention analysis
+        print("1. Analyzing retention by event...")
+        retention_future = executor.submit(retention_analysis, attended, rsvped, events, outdir)
+
+        # 2. New attendees analysis
+        print("2. Analyzing new attendees...")
+        new_members_future = executor.submit(new_members_analysis, master, attended, rsvped, events, outdir)
 
-    # 2. New attendees analysis
-    print("2. Analyzing new attendees...")
-    new_by_event, new_by_category = new_members_analysis(master, events, outdir)
+        # 3. Party analysis
+        print("3. Analyzing big parties...")
+        party_future = executor.submit(party_analysis, master, attended, rsvped, events, outdir)
 
-    # 3. Party analysis
-    print("3. Analyzing big parties...")
-    party_df = party_analysis(master, events, outdir)
+        # 4. RSVP conversion (two versions)
+        print("4. Analyzing RSVP conversion...")
+        conversion_future = executor.submit(rsvp_conversion_analysis, attended, rsvped, outdir)
 
-    # 4. RSVP conversion (two versions)
-    print("4. Analyzing RSVP conversion...")
-    conversion_stats = rsvp_conversion_analysis(master, outdir)
+        # 5. Generate summary stats
+        print("5. Generating summary statistics...")
+        summary_stats = generate_summary_stats(master, attended, outdir)
 
-    # 5. Generate summary stats
-    print("5. Generating summary statistics...")
-    summary_stats = generate_summary_stats(master, outdir)
+        retention_df = retention_future.result()
+        new_by_event, new_by_category = new_members_future.result()
+        party_df = party_future.result()
+        conversion_stats = conversion_future.result()
 
     print(f"\n✅ Analysis complete! All outputs saved to: {outdir.resolve()}")
     print("\nGenerated files:")
-    for file in sorted(outdir.glob('*')):
+    for file in sorted(f for f in outdir.glob('*') if f.is_file()):
         print(f"  - {file.name}")
 
 if __name__ == '__main__':
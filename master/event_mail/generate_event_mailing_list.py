@@ -13,10 +13,11 @@ import os
 import sys
 import re
 import csv
+from collections import namedtuple
+from itertools import chain
 from datetime import datetime
 from dotenv import load_dotenv
 import psycopg2
-from psycopg2.extras import RealDictCursor
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,6 +29,40 @@ DB_CONFIG = {
     'database': os.getenv('PGDATABASE', 'postgres'),
     'user': os.getenv('PGUSER', 'postgres'),
     'password': os.getenv('PGPASSWORD'),
+    # Fail fast on a stalled Railway link and cap runaway queries at 60s
+    'connect_timeout': 10,
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 5,
+    'options': '-c statement_timeout=60000',
+}
+
+# Most recent events offered in the selection menu
+EVENT_MENU_LIMIT = 100
+
+# One row of the event selection menu, in fetch_all_events() column order
+Event = namedtuple('Event', 'id event_name start_datetime category attendance location')
+
+# Rows per round-trip when streaming attendees from the server-side cursor
+ATTENDEE_FETCH_SIZE = 2000
+
+# sanitize_filename(): characters dropped from filenames, and underscore runs
+SANITIZE_STRIP = re.compile(r'[^a-zA-Z0-9_-]')
+SANITIZE_COLLAPSE = re.compile(r'_+')
+
+# Indexes behind fetch_attendee_data(): the partial index drives the checked-in
+# attendee scan, the contacts index serves the preferred_contacts lookup
+ATTENDEE_INDEXES = {
+    'idx_attendance_event_checkedin': """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_event_checkedin
+    ON Attendance (event_id, person_id)
+    WHERE checked_in = TRUE
+    """,
+    'idx_contacts_person_type': """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contacts_person_type
+    ON Contacts (person_id, contact_type)
+    """,
 }
 
 
@@ -41,12 +76,60 @@ def get_db_connection():
         sys.exit(1)
 
 
+def ensure_indexes(conn):
+    """
+    Create the attendee lookup indexes if they are missing or invalid.
+
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so the
+    connection is switched to autocommit for the duration. A build waits for
+    open transactions on the table, so the statement timeout is lifted while
+    it runs. An interrupted concurrent build leaves an INVALID index that
+    IF NOT EXISTS would keep skipping, so those are dropped and rebuilt. An
+    index still being built by another session is also INVALID, so it is left
+    alone until that build finishes.
+    Failures (e.g. a role without CREATE privilege) are reported but not fatal.
+    """
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = 0")
+            try:
+                for index_name, statement in ATTENDEE_INDEXES.items():
+                    cur.execute("""
+                        SELECT
+                            i.indisvalid,
+                            EXISTS (
+                                SELECT 1 FROM pg_stat_progress_create_index p
+                                WHERE p.index_relid = i.indexrelid
+                            )
+                        FROM pg_index i
+                        WHERE i.indexrelid = to_regclass(%s)
+                    """, (index_name,))
+                    existing = cur.fetchone()
+                    if existing and existing[0]:
+                        continue
+                    if existing and existing[1]:
+                        print(f"⚠️  Index {index_name} is still being built by another session; skipping")
+                        continue
+                    if existing:
+                        print(f"⚠️  Rebuilding invalid index {index_name}")
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+                    print(f"Building index {index_name} (waits for open transactions on the table)...")
+                    cur.execute(statement)
+            finally:
+                cur.execute("RESET statement_timeout")
+    except psycopg2.Error as e:
+        print(f"⚠️  Could not create attendee indexes: {e}")
+    finally:
+        conn.autocommit = False
+
+
 def fetch_all_events(conn):
     """
-    Fetch all events from the database, ordered by start_datetime (most recent first).
+    Fetch the EVENT_MENU_LIMIT most recent events, ordered by start_datetime (most recent first).
 
     Returns:
-        list: List of event dictionaries with id, event_name, start_datetime, category, attendance
+        list: List of Event tuples with id, event_name, start_datetime, category, attendance, location
     """
     query = """
     SELECT
@@ -58,13 +141,13 @@ def fetch_all_events(conn):
         location
     FROM Events
     ORDER BY start_datetime DESC
+    LIMIT %s
     """
 
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query)
-            events = cur.fetchall()
-            return events
+        with conn.cursor() as cur:
+            cur.execute(query, (EVENT_MENU_LIMIT,))
+            return [Event(*row) for row in cur]
     except psycopg2.Error as e:
         print(f"Error fetching events: {e}")
         sys.exit(1)
@@ -75,10 +158,10 @@ def display_event_menu(events):
     Display an interactive menu of events and prompt user to select one.
 
     Args:
-        events (list): List of event dictionaries
+        events (list): List of Event tuples
 
     Returns:
-        dict: Selected event dictionary
+        Event: Selected event
     """
     if not events:
         print("No events found in the database.")
@@ -90,13 +173,13 @@ def display_event_menu(events):
 
     for idx, event in enumerate(events, 1):
         # Format the datetime
-        event_date = event['start_datetime'].strftime('%Y-%m-%d %H:%M') if event['start_datetime'] else 'No date'
-        attendance = event['attendance'] if event['attendance'] else 0
+        event_date = event.start_datetime.strftime('%Y-%m-%d %H:%M') if event.start_datetime else 'No date'
+        attendance = event.attendance if event.attendance else 0
 
-        print(f"\n{idx}. {event['event_name']}")
-        print(f"   Date: {event_date} | Category: {event['category']} | Attendance: {attendance}")
-        if event['location']:
-            print(f"   Location: {event['location']}")
+        print(f"\n{idx}. {event.event_name}")
+        print(f"   Date: {event_date} | Category: {event.category} | Attendance: {attendance}")
+        if event.location:
+            print(f"   Location: {event.location}")
 
     print("\n" + "="*80)
 
@@ -113,7 +196,7 @@ def display_event_menu(events):
 
             if 1 <= selection_num <= len(events):
                 selected_event = events[selection_num - 1]
-                print(f"\nSelected: {selected_event['event_name']}")
+                print(f"\nSelected: {selected_event.event_name}")
                 return selected_event
             else:
                 print(f"Please enter a number between 1 and {len(events)}")
@@ -125,38 +208,52 @@ def fetch_attendee_data(conn, event_id):
     """
     Fetch attendee data for the specified event.
 
-    Only includes people who actually checked in (not just RSVPed).
+    Only includes people who actually checked in (not just RSVPed) and have an
+    email address on file.
     Includes lifetime event_count (total events attended across all time).
     Prefers school email over personal email for contact_value.
 
+    Rows are streamed from a server-side cursor, ATTENDEE_FETCH_SIZE at a
+    time, so memory stays flat however large the event is.
+
     Args:
         conn: Database connection
         event_id (int): Event ID to fetch attendees for
 
-    Returns:
-        list: List of dictionaries with keys: first_name, last_name, school, contact_value, event_count
+    Yields:
+        tuple: (first_name, last_name, school, contact_value, event_count), in CSV column order
     """
     query = """
-    WITH event_attendance_counts AS (
+    WITH target_people AS (
+        -- People who checked in to this event; the CTEs below only look at them
+        SELECT person_id
+        FROM Attendance
+        WHERE event_id = %(event_id)s
+          AND checked_in = TRUE
+    ),
+    event_attendance_counts AS (
         -- Calculate lifetime attendance count for each person
         SELECT
             person_id,
             COUNT(*) as event_count
         FROM Attendance
         WHERE checked_in = TRUE
+          AND person_id IN (SELECT person_id FROM target_people)
         GROUP BY person_id
     ),
     preferred_contacts AS (
         -- Get preferred email (school email first, personal email as fallback)
-        SELECT
+        SELECT DISTINCT ON (person_id)
             person_id,
-            COALESCE(
-                MAX(CASE WHEN contact_type = 'school email' THEN contact_value END),
-                MAX(CASE WHEN contact_type = 'personal email' THEN contact_value END)
-            ) as contact_value
+            contact_value
         FROM Contacts
         WHERE contact_type IN ('school email', 'personal email')
-        GROUP BY person_id
+          AND contact_value <> ''
+          AND person_id IN (SELECT person_id FROM target_people)
+        ORDER BY
+            person_id,
+            CASE contact_type WHEN 'school email' THEN 0 ELSE 1 END,
+            contact_value DESC
     )
     SELECT
         p.first_name,
@@ -167,17 +264,17 @@ def fetch_attendee_data(conn, event_id):
     FROM Attendance a
     JOIN People p ON a.person_id = p.id
     LEFT JOIN event_attendance_counts e ON p.id = e.person_id
-    LEFT JOIN preferred_contacts c ON p.id = c.person_id
-    WHERE a.event_id = %s
+    JOIN preferred_contacts c ON p.id = c.person_id
+    WHERE a.event_id = %(event_id)s
       AND a.checked_in = TRUE
     ORDER BY p.last_name, p.first_name
     """
 
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, (event_id,))
-            attendees = cur.fetchall()
-            return attendees
+        with conn.cursor(name='attendee_stream') as cur:
+            cur.itersize = ATTENDEE_FETCH_SIZE
+            cur.execute(query, {'event_id': event_id})
+            yield from cur
     except psycopg2.Error as e:
         print(f"Error fetching attendee data: {e}")
         sys.exit(1)
@@ -196,9 +293,9 @@ def sanitize_filename(filename):
     # Replace spaces with underscores
     filename = filename.replace(' ', '_')
     # Remove special characters (keep alphanumeric, underscores, hyphens)
-    filename = re.sub(r'[^a-zA-Z0-9_-]', '', filename)
+    filename = SANITIZE_STRIP.sub('', filename)
     # Collapse multiple underscores into one
-    filename = re.sub(r'_+', '_', filename)
+    filename = SANITIZE_COLLAPSE.sub('_', filename)
     # Remove leading/trailing underscores
     filename = filename.strip('_')
     return filename
@@ -206,10 +303,10 @@ def sanitize_filename(filename):
 
 def export_to_csv(attendees, event_name, output_dir):
     """
-    Export attendee data to a CSV file.
+    Export attendee data to a CSV file, writing each row as it arrives.
 
     Args:
-        attendees (list): List of attendee dictionaries
+        attendees (iterable): Attendee tuples in CSV column order, e.g. from fetch_attendee_data()
         event_name (str): Name of the event (used for filename)
         output_dir (str): Directory to save the CSV file
 
@@ -227,40 +324,21 @@ def export_to_csv(attendees, event_name, output_dir):
     # Define CSV columns
     fieldnames = ['first_name', 'last_name', 'school', 'contact_value', 'event_count']
 
-    # Track attendees without email
-    no_email_count = 0
-    rows_to_write = []
-
-    for attendee in attendees:
-        if not attendee['contact_value']:
-            no_email_count += 1
-            # Skip attendees without email addresses
-            continue
-
-        rows_to_write.append({
-            'first_name': attendee['first_name'] or '',
-            'last_name': attendee['last_name'] or '',
-            'school': attendee['school'] or '',
-            'contact_value': attendee['contact_value'],
-            'event_count': attendee['event_count']
-        })
-
-    # Write to CSV
+    # Write to CSV (csv.writer writes NULLs as empty fields)
+    exported_count = 0
     try:
         with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows_to_write)
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+
+            for exported_count, attendee in enumerate(attendees, 1):
+                writer.writerow(attendee)
 
         print(f"\n{'='*80}")
         print("EXPORT SUCCESSFUL")
         print(f"{'='*80}")
         print(f"File saved to: {filepath}")
-        print(f"Total attendees exported: {len(rows_to_write)}")
-
-        if no_email_count > 0:
-            print(f"⚠️  Skipped {no_email_count} attendee(s) without email addresses")
-
+        print(f"Total attendees exported: {exported_count}")
         print(f"{'='*80}\n")
 
         return filepath
@@ -285,6 +363,8 @@ def main():
     print("✓ Connected successfully")
 
     try:
+        ensure_indexes(conn)
+
         # Fetch all events
         print("\nFetching events from database...")
         events = fetch_all_events(conn)
@@ -293,22 +373,25 @@ def main():
         # Display menu and get user selection
         selected_event = display_event_menu(events)
 
-        # Fetch attendee data for selected event
-        print(f"\nFetching attendee data for '{selected_event['event_name']}'...")
-        attendees = fetch_attendee_data(conn, selected_event['id'])
-        print(f"✓ Found {len(attendees)} attendees who checked in")
+        # Stream attendee data for selected event (peek at the first row to
+        # catch events with nobody checked in before creating a file)
+        print(f"\nFetching attendee data for '{selected_event.event_name}'...")
+        attendees = fetch_attendee_data(conn, selected_event.id)
+        first_attendee = next(attendees, None)
 
-        if not attendees:
-            print("\nNo attendees found for this event.")
+        if first_attendee is None:
+            print("\nNo attendees with an email address found for this event.")
             print("Make sure attendees have 'checked_in = TRUE' in the database.")
             sys.exit(0)
 
+        attendees = chain([first_attendee], attendees)
+
         # Export to CSV
         output_dir = os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
             '.'  # Current directory (/master/event_mail/)
         )
-        export_to_csv(attendees, selected_event['event_name'], output_dir)
+        export_to_csv(attendees, selected_event.event_name, output_dir)
 
     finally:
         # Close database connection
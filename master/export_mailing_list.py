@@ -6,7 +6,6 @@ Creates a CSV with first_name, last_name, and email columns
 
 import os
 import psycopg2
-import pandas as pd
 from dotenv import load_dotenv
 
 def export_mailing_list():
@@ -21,7 +20,14 @@ def export_mailing_list():
         'user': os.getenv('PGUSER'),
         'password': os.getenv('PGPASSWORD'),
         'host': os.getenv('PGHOST'),
-        'port': os.getenv('PGPORT')
+        'port': os.getenv('PGPORT'),
+        # Fail fast on a stalled Railway link and cap runaway queries at 60s
+        'connect_timeout': 10,
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 5,
+        'options': '-c statement_timeout=60000',
     }
 
     # Connect to database
@@ -29,32 +35,36 @@ def export_mailing_list():
     conn = psycopg2.connect(**db_config)
 
     try:
-        # Query allmailing table
+        # Query allmailing table; Postgres formats the CSV itself and COPY
+        # streams it straight into the file
         query = """
-        SELECT
-            first_name,
-            last_name,
-            contact_value as email
-        FROM allmailing
-        ORDER BY last_name, first_name
+        COPY (
+            SELECT
+                first_name,
+                last_name,
+                contact_value as email
+            FROM allmailing
+            ORDER BY last_name, first_name
+        ) TO STDOUT WITH CSV HEADER
         """
 
-        print("Querying allmailing table...")
-        df = pd.read_sql_query(query, conn)
-
         # Output file path
         output_path = os.path.join(
             os.path.dirname(__file__),
             'mailing_list.csv'
         )
 
-        # Export to CSV
-        df.to_csv(output_path, index=False)
+        print("Querying allmailing table...")
+        with conn.cursor() as cur, open(output_path, 'wb') as f:
+            cur.copy_expert(query, f)
+            record_count = cur.rowcount
 
-        print(f"\nExported {len(df)} records to: {output_path}")
-        print(f"\nColumns: {', '.join(df.columns)}")
+        print(f"\nExported {record_count} records to: {output_path}")
+        print("\nColumns: first_name, last_name, email")
         print(f"First few rows:")
-        print(df.head(10).to_string(index=False))
+        with open(output_path, encoding='utf-8') as f:
+            for _, line in zip(range(11), f):
+                print(line, end='')
 
     finally:
         # Close connection
@@ -10,13 +10,18 @@ Usage:
 
 import sys
 import argparse
+import csv
+import io
+import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 import os
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz, process
 import re
+from bisect import insort
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
@@ -50,35 +55,26 @@ def get_db_connection():
     """Create a new database connection."""
     return psycopg2.connect(**DB_CONFIG)
 
-def ensure_connection(conn, force_refresh=False):
-    """Test and refresh connection if needed. Returns valid connection."""
-    if force_refresh:
-        print("🔄 Refreshing connection...")
-        try:
-            # Commit any pending work before closing
-            conn.commit()
-            conn.close()
-        except:
-            pass
-        new_conn = get_db_connection()
-        print("✓ Connection refreshed successfully")
-        return new_conn
-
+def reconnect(conn):
+    """Replace a dropped connection with a fresh one."""
+    print("⚠️  Connection lost, reconnecting...")
     try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1")
-        return conn
-    except (psycopg2.OperationalError, psycopg2.InterfaceError):
-        print("⚠️  Connection lost, reconnecting...")
-        try:
-            conn.close()
-        except:
-            pass
-        return get_db_connection()
+        conn.close()
+    except:
+        pass
+    return get_db_connection()
 
 # Import all helper functions from notebook
 def fuzzy_ratio(str_a, str_b):
-    return SequenceMatcher(None, str_a, str_b).ratio()
+    return fuzz.ratio(str_a, str_b) / 100.0
+
+def ratio_reaches(str_a, str_b, threshold):
+    """fuzzy_ratio(str_a, str_b) >= threshold, skipping the ratio when the lengths already rule it out."""
+    total = len(str_a) + len(str_b)
+    # The Indel ratio is at most 2 * shorter / total (tiny allowance for float rounding)
+    if total and 2 * min(len(str_a), len(str_b)) / total < threshold - 1e-9:
+        return False
+    return fuzzy_ratio(str_a, str_b) >= threshold
 
 def is_initial(name):
     cleaned = name.strip().lower()
@@ -94,7 +90,10 @@ def compare_names(fn_ta, ln_ta, fn_sheet, ln_sheet, fuzzy_threshold):
     ln_ta = str(ln_ta) if pd.notna(ln_ta) else ""
     fn_sheet = str(fn_sheet) if pd.notna(fn_sheet) else ""
     ln_sheet = str(ln_sheet) if pd.notna(ln_sheet) else ""
+    return compare_clean_names(fn_ta, ln_ta, is_initial(fn_ta), is_initial(ln_ta), fn_sheet, ln_sheet, fuzzy_threshold)
 
+def compare_clean_names(fn_ta, ln_ta, fn_ta_is_initial, ln_ta_is_initial, fn_sheet, ln_sheet, fuzzy_threshold):
+    """compare_names for already-cleaned strings, with the query's is_initial flags computed once by the caller."""
     if fn_ta == fn_sheet and ln_ta == ln_sheet:
         return "auto_accept"
     if (fn_ta in fn_sheet and ln_sheet == ln_ta) or (fn_sheet in fn_ta and ln_ta == ln_sheet):
@@ -102,9 +101,6 @@ def compare_names(fn_ta, ln_ta, fn_sheet, ln_sheet, fuzzy_threshold):
     if (fn_ta == fn_sheet and ln_ta in ln_sheet) or (fn_sheet == fn_ta and ln_sheet in ln_ta):
         return "auto_accept"
 
-    fn_ta_is_initial = is_initial(fn_ta)
-    ln_ta_is_initial = is_initial(ln_ta)
-
     if fn_ta_is_initial or ln_ta_is_initial:
         if fn_ta_is_initial:
             letter = fn_ta[0].lower()
@@ -116,14 +112,12 @@ def compare_names(fn_ta, ln_ta, fn_sheet, ln_sheet, fuzzy_threshold):
                 return "reject_now"
 
         if fn_ta_is_initial and not ln_ta_is_initial:
-            ratio_last = fuzzy_ratio(ln_ta, ln_sheet)
-            if ratio_last >= fuzzy_threshold:
+            if ratio_reaches(ln_ta, ln_sheet, fuzzy_threshold):
                 return "manual_review"
             else:
                 return "reject_now"
         elif ln_ta_is_initial and not fn_ta_is_initial:
-            ratio_first = fuzzy_ratio(fn_ta, fn_sheet)
-            if ratio_first >= fuzzy_threshold:
+            if ratio_reaches(fn_ta, fn_sheet, fuzzy_threshold):
                 return "manual_review"
             else:
                 return "reject_now"
@@ -132,23 +126,141 @@ def compare_names(fn_ta, ln_ta, fn_sheet, ln_sheet, fuzzy_threshold):
 
     exact_first = (fn_ta == fn_sheet)
     exact_last = (ln_ta == ln_sheet)
-    ratio_first = fuzzy_ratio(fn_ta, fn_sheet)
-    ratio_last = fuzzy_ratio(ln_ta, ln_sheet)
+    first_close = ratio_reaches(fn_ta, fn_sheet, fuzzy_threshold)
+    last_close = ratio_reaches(ln_ta, ln_sheet, fuzzy_threshold)
 
-    if exact_first and ratio_last >= fuzzy_threshold:
+    if exact_first and last_close:
         print(f"Matching {fn_ta} {ln_ta} to {fn_sheet} {ln_sheet}")
         return "auto_accept"
-    if exact_last and ratio_first >= fuzzy_threshold:
+    if exact_last and first_close:
         print(f"Matching {fn_ta} {ln_ta} to {fn_sheet} {ln_sheet}")
         return "auto_accept"
 
-    if ratio_first >= fuzzy_threshold and ratio_last >= fuzzy_threshold:
+    if first_close and last_close:
         return "manual_review"
 
     return "reject_now"
 
-def update_names_if_substring(conn, person_id, sheet_first, sheet_last, input_first, input_last):
-    """Update first_name and last_name in database to the longer version if one is substring of other."""
+def load_people_cache(conn):
+    """
+    Load People and Contacts once so find_person_id can match rows without querying.
+
+    Returns a dict with:
+        people: {id: person dict (id, first_name, last_name, gender, is_jewish)}, in id order
+        by_name: {(first_lower, last_lower): [ids]}
+        by_first_name: {first_lower: [ids]}
+        by_last_name: {last_lower: [ids]}
+        by_contact: {contact_value_lower: person_id}, first contact row wins
+        emails: {person_id: {'school email' / 'personal email': contact_value}}, first row of each type wins
+        provisional: ids of people added during this import, not yet in People
+        renamed: ids of snapshot people renamed by update_names_if_substring
+        names_version: bumped whenever a person is added or renamed
+        matches: {key: (names_version, person_id)} remembered by cached_match()
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT id, first_name, last_name, gender, is_jewish FROM People ORDER BY id")
+        people = cur.fetchall()
+        cur.execute("SELECT person_id, contact_type, contact_value FROM Contacts ORDER BY id")
+        contacts = cur.fetchall()
+
+    people_cache = {
+        'people': {},
+        'by_name': defaultdict(list),
+        'by_first_name': defaultdict(list),
+        'by_last_name': defaultdict(list),
+        'by_contact': {},
+        'emails': defaultdict(dict),
+        'provisional': set(),
+        'renamed': set(),
+        'names_version': 0,
+        'matches': {},
+    }
+    for person in people:
+        cache_add_person(people_cache, person)
+    for contact in contacts:
+        cache_add_contact(people_cache, contact['person_id'], contact['contact_type'], contact['contact_value'])
+    return people_cache
+
+def _name_keys(person):
+    first = (person['first_name'] or '').lower()
+    last = (person['last_name'] or '').lower()
+    return first, last
+
+def cache_add_person(people_cache, person):
+    """Add a person dict (id, first_name, last_name, gender, is_jewish) to the cache indexes."""
+    first, last = _name_keys(person)
+    people_cache['people'][person['id']] = person
+    insort(people_cache['by_name'][(first, last)], person['id'])
+    insort(people_cache['by_first_name'][first], person['id'])
+    insort(people_cache['by_last_name'][last], person['id'])
+    people_cache['names_version'] += 1
+
+def cache_add_contact(people_cache, person_id, contact_type, contact_value):
+    """Record a contact for person_id; the first person or email of each type recorded wins."""
+    people_cache['by_contact'].setdefault(contact_value.lower(), person_id)
+    if contact_type in ('school email', 'personal email'):
+        people_cache['emails'][person_id].setdefault(contact_type, contact_value)
+
+def cache_rename_person(people_cache, person_id, first_name, last_name):
+    """Update a cached person's name and re-key the name indexes."""
+    person = people_cache['people'][person_id]
+    if (person['first_name'], person['last_name']) == (first_name, last_name):
+        return
+    first, last = _name_keys(person)
+    people_cache['by_name'][(first, last)].remove(person_id)
+    people_cache['by_first_name'][first].remove(person_id)
+    people_cache['by_last_name'][last].remove(person_id)
+    person['first_name'] = first_name
+    person['last_name'] = last_name
+    first, last = _name_keys(person)
+    insort(people_cache['by_name'][(first, last)], person_id)
+    insort(people_cache['by_first_name'][first], person_id)
+    insort(people_cache['by_last_name'][last], person_id)
+    # People added during this import are written with their final names anyway
+    if person_id not in people_cache['provisional']:
+        people_cache['renamed'].add(person_id)
+    people_cache['names_version'] += 1
+
+def cache_order(person_id):
+    """Sort key for cached people: the snapshot in id order, then people added this import."""
+    # People added during the import carry provisional ids -1, -2, ...
+    return (person_id < 0, abs(person_id))
+
+def fuzzy_candidates(first_name, last_name, both_initials, candidates, fuzzy_threshold):
+    """
+    Narrow candidates to those compare_names could accept or send to manual review.
+
+    Every non-reject verdict needs the first or last name ratio to reach the
+    threshold, unless both query names are initials. fuzzy_ratio uses the same
+    RapidFuzz scorer, so scoring all candidates in one cdist call and dropping
+    those under the threshold on both names loses no match.
+
+    Returns (candidate, first_name, last_name) triples with the candidate's names
+    already cleaned the way compare_names cleans them.
+    """
+    first_names = [str(c['first_name']) if pd.notna(c['first_name']) else "" for c in candidates]
+    last_names = [str(c['last_name']) if c['last_name'] else "" for c in candidates]
+    if both_initials:
+        return list(zip(candidates, first_names, last_names))
+
+    first_scores = process.cdist([first_name], first_names, scorer=fuzz.ratio, workers=-1)[0]
+    last_scores = process.cdist([last_name], last_names, scorer=fuzz.ratio, workers=-1)[0]
+
+    # Small allowance so float32 rounding never drops a borderline candidate
+    cutoff = fuzzy_threshold * 100 - 0.01
+    keep = (first_scores >= cutoff) | (last_scores >= cutoff)
+    return [
+        (candidate, first, last)
+        for candidate, first, last, kept in zip(candidates, first_names, last_names, keep)
+        if kept
+    ]
+
+def update_names_if_substring(people_cache, person_id, sheet_first, sheet_last, input_first, input_last):
+    """
+    Update first_name and last_name to the longer version if one is substring of other.
+
+    The change is made in the cache; flush_import_rows() writes it to People.
+    """
     if pd.isna(sheet_first) or not sheet_first:
         sheet_first = ""
     if pd.isna(input_first) or not input_first:
@@ -166,34 +278,30 @@ def update_names_if_substring(conn, person_id, sheet_first, sheet_last, input_fi
             updates['last_name'] = longer_last
 
     if updates:
-        with conn.cursor() as cur:
-            set_clause = ', '.join([f"{k} = %s" for k in updates.keys()])
-            values = list(updates.values()) + [person_id]
-            cur.execute(f"UPDATE People SET {set_clause} WHERE id = %s", values)
-        conn.commit()
+        person = people_cache['people'][person_id]
+        cache_rename_person(
+            people_cache,
+            person_id,
+            updates.get('first_name', person['first_name']),
+            updates.get('last_name', person['last_name'])
+        )
 
-def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_list=None, fuzzy_threshold=0.80):
-    """Find person ID by email, phone, or name matching."""
+def find_person_id(row, people_cache, email_col=None, phone_col=None, handle_indices_list=None, fuzzy_threshold=0.80):
+    """Find person ID by email, phone, or name matching against the load_people_cache() snapshot."""
 
     first_name = row["first_name"].strip().lower() if not pd.isna(row["first_name"]) else None
     last_name = row.get("last_name")
     last_name = last_name.strip().lower() if pd.notna(last_name) else None
+    people = people_cache['people']
 
     # Email matching
     if email_col and email_col in row and pd.notna(row[email_col]):
         email = row[email_col]
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT person_id FROM Contacts WHERE LOWER(contact_value) = LOWER(%s)",
-                (email,)
-            )
-            result = cur.fetchone()
-            if result:
-                person_id = result['person_id']
-                cur.execute("SELECT first_name, last_name FROM People WHERE id = %s", (person_id,))
-                person = cur.fetchone()
-                update_names_if_substring(conn, person_id, person['first_name'], person['last_name'], first_name, last_name)
-                return person_id
+        person_id = people_cache['by_contact'].get(email.lower())
+        if person_id is not None:
+            person = people[person_id]
+            update_names_if_substring(people_cache, person_id, person['first_name'], person['last_name'], first_name, last_name)
+            return person_id
         print(f"Could not find person with email: {email}")
     else:
         email = None
@@ -201,40 +309,26 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
     # Phone matching
     if phone_col and phone_col in row and pd.notna(row[phone_col]):
         phone = row[phone_col]
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT person_id FROM Contacts WHERE LOWER(contact_value) = LOWER(%s)",
-                (phone,)
-            )
-            result = cur.fetchone()
-            if result:
-                person_id = result['person_id']
-                cur.execute("SELECT first_name, last_name FROM People WHERE id = %s", (person_id,))
-                person = cur.fetchone()
-                update_names_if_substring(conn, person_id, person['first_name'], person['last_name'], first_name, last_name)
-                return person_id
+        person_id = people_cache['by_contact'].get(phone.lower())
+        if person_id is not None:
+            person = people[person_id]
+            update_names_if_substring(people_cache, person_id, person['first_name'], person['last_name'], first_name, last_name)
+            return person_id
         print(f"Could not find person with phone: {phone}")
 
     if not first_name:
         return None
 
     # Exact name matching
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        if last_name:
-            cur.execute(
-                "SELECT * FROM People WHERE LOWER(first_name) = %s AND LOWER(last_name) = %s",
-                (first_name, last_name)
-            )
-        else:
-            cur.execute(
-                "SELECT * FROM People WHERE LOWER(first_name) = %s",
-                (first_name,)
-            )
-        potentials = cur.fetchall()
+    if last_name:
+        potential_ids = people_cache['by_name'].get((first_name, last_name), [])
+    else:
+        potential_ids = people_cache['by_first_name'].get(first_name, [])
+    potentials = [people[person_id] for person_id in potential_ids]
 
     if len(potentials) == 1:
         person = potentials[0]
-        update_names_if_substring(conn, person['id'], person['first_name'], person['last_name'], first_name, last_name)
+        update_names_if_substring(people_cache, person['id'], person['first_name'], person['last_name'], first_name, last_name)
         return person['id']
 
     elif len(potentials) > 1:
@@ -250,25 +344,31 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
         try:
             selected = potentials[int(choice)]
             person_id = selected['id']
-            update_names_if_substring(conn, person_id, selected['first_name'], selected['last_name'], first_name, last_name)
+            update_names_if_substring(people_cache, person_id, selected['first_name'], selected['last_name'], first_name, last_name)
             return person_id
         except:
             print("Invalid choice. Skipping.")
             handle_indices_list.append((first_name, last_name))
             return None
 
-    # Fuzzy matching
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT * FROM People")
-        all_people = cur.fetchall()
+    # Fuzzy matching (compare_names runs only on candidates that can still pass,
+    # with the query side cleaned and checked for initials once)
+    query_last = last_name or ""
+    first_is_initial = is_initial(first_name)
+    last_is_initial = is_initial(query_last)
+    candidates = fuzzy_candidates(
+        first_name, query_last, first_is_initial and last_is_initial, list(people.values()), fuzzy_threshold
+    )
 
     auto_accepts, manual_reviews = [], []
-    for candidate in all_people:
-        verdict = compare_names(
+    for candidate, candidate_first, candidate_last in candidates:
+        verdict = compare_clean_names(
             first_name,
-            (last_name or ""),
-            candidate["first_name"],
-            candidate["last_name"] if candidate["last_name"] else "",
+            query_last,
+            first_is_initial,
+            last_is_initial,
+            candidate_first,
+            candidate_last,
             fuzzy_threshold,
         )
         if verdict == "auto_accept":
@@ -278,7 +378,7 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
 
     if len(auto_accepts) == 1:
         person = auto_accepts[0]
-        update_names_if_substring(conn, person['id'], person['first_name'], person['last_name'], first_name, last_name)
+        update_names_if_substring(people_cache, person['id'], person['first_name'], person['last_name'], first_name, last_name)
         return person['id']
 
     if len(auto_accepts) > 1:
@@ -293,7 +393,7 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
             return None
         try:
             person = auto_accepts[int(choice)]
-            update_names_if_substring(conn, person['id'], person['first_name'], person['last_name'], first_name, last_name)
+            update_names_if_substring(people_cache, person['id'], person['first_name'], person['last_name'], first_name, last_name)
             return person['id']
         except:
             print("Invalid choice. Skipping.")
@@ -312,7 +412,7 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
             return None
         try:
             person = manual_reviews[int(choice)]
-            update_names_if_substring(conn, person['id'], person['first_name'], person['last_name'], first_name, last_name)
+            update_names_if_substring(people_cache, person['id'], person['first_name'], person['last_name'], first_name, last_name)
             return person['id']
         except:
             print("Invalid choice. Skipping.")
@@ -323,12 +423,35 @@ def find_person_id(row, conn, email_col=None, phone_col=None, handle_indices_lis
     handle_indices_list.append((first_name, last_name))
     return None
 
-def match_tracking_link_to_person(conn, link_value, fuzzy_threshold=0.8):
+# Tracking link values that are channels rather than a referrer's name
+GENERIC_TRACKING_CODES = frozenset({
+    'default', 'emailreferral', 'email_first_button',
+    'email_second_button', 'email', 'txt', 'insta',
+    'maillist', 'lastname', '[name]'
+})
+LINK_SEPARATORS_TO_SPACES = str.maketrans({'_': ' ', '-': ' '})
+
+def cached_match(people_cache, key, match):
+    """
+    Return match(), remembered under key until a person is added or renamed.
+
+    Name matches depend on every cached name, so any change invalidates them;
+    a match that itself renames someone is recomputed next time.
+    """
+    names_version = people_cache['names_version']
+    cached = people_cache['matches'].get(key)
+    if cached is not None and cached[0] == names_version:
+        return cached[1]
+    person_id = match()
+    people_cache['matches'][key] = (names_version, person_id)
+    return person_id
+
+def match_tracking_link_to_person(people_cache, link_value, fuzzy_threshold=0.8):
     """
     Match a tracking link value to a person in the database using fuzzy matching.
 
     Args:
-        conn: Database connection
+        people_cache: load_people_cache() snapshot, including people added during this import
         link_value: The tracking link string (e.g., "doron", "[name]", "admlzr")
         fuzzy_threshold: Fuzzy matching threshold (default 0.8)
 
@@ -342,12 +465,7 @@ def match_tracking_link_to_person(conn, link_value, fuzzy_threshold=0.8):
     link_value = str(link_value).strip().lower()
 
     # Skip generic tracking codes that don't represent personal referrals
-    generic_codes = {
-        'default', 'emailreferral', 'email_first_button',
-        'email_second_button', 'email', 'txt', 'insta',
-        'maillist', 'lastname', '[name]'
-    }
-    if link_value in generic_codes:
+    if link_value in GENERIC_TRACKING_CODES:
         return None
 
     # Determine if this is a single word (no underscores or hyphens)
@@ -355,109 +473,95 @@ def match_tracking_link_to_person(conn, link_value, fuzzy_threshold=0.8):
 
     # Try to extract a name from the link value
     # Remove common prefixes/suffixes
-    clean_name = link_value.replace('_', ' ').replace('-', ' ').strip()
-
-    # Get all people from database
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT id, first_name, last_name FROM People")
-        all_people = cur.fetchall()
-
-    # Try exact match on first name (and last name only if multi-word)
-    for person in all_people:
-        first = person['first_name'].lower() if person['first_name'] else ''
-        last = person['last_name'].lower() if person['last_name'] else ''
-
-        # Always check first name
-        if clean_name == first:
-            return person['id']
-
-        # Only check last name if this is a multi-word tracking link
-        if not is_single_word and clean_name == last:
-            return person['id']
-
-    # Try fuzzy matching on first name (and last name only if multi-word)
-    best_match = None
-    best_ratio = 0
-
-    for person in all_people:
-        first = person['first_name'].lower() if person['first_name'] else ''
-        last = person['last_name'].lower() if person['last_name'] else ''
+    clean_name = link_value.translate(LINK_SEPARATORS_TO_SPACES).strip()
+
+    # Try exact match on first name (and last name only if multi-word),
+    # taking the earliest person in cache order
+    exact_ids = people_cache['by_first_name'].get(clean_name, [])
+    if not is_single_word:
+        exact_ids = exact_ids + people_cache['by_last_name'].get(clean_name, [])
+    if exact_ids:
+        return min(exact_ids, key=cache_order)
+
+    # Try fuzzy matching on first name (and last name only if multi-word);
+    # the first person with the best score wins
+    all_people = list(people_cache['people'].values())
+    if not all_people:
+        return None
+    first_names = [(p['first_name'] or '').lower() for p in all_people]
+    scores = process.cdist([clean_name], first_names, scorer=fuzz.ratio, dtype=np.float64, workers=-1)[0]
+    if not is_single_word:
+        last_names = [(p['last_name'] or '').lower() for p in all_people]
+        last_scores = process.cdist([clean_name], last_names, scorer=fuzz.ratio, dtype=np.float64, workers=-1)[0]
+        scores = np.maximum(scores, last_scores)
+
+    best = int(np.argmax(scores))
+    if scores[best] / 100.0 >= fuzzy_threshold:
+        return all_people[best]['id']
+    return None
 
-        # Check fuzzy match against first name
-        if first:
-            ratio = fuzzy_ratio(clean_name, first)
-            if ratio >= fuzzy_threshold and ratio > best_ratio:
-                best_ratio = ratio
-                best_match = person['id']
+GENDER_CODES = {
+    "f": "F", "female": "F", "woman": "F", "girl": "F",
+    "m": "M", "male": "M", "man": "M", "boy": "M",
+}
+IS_JEWISH_CODES = {"J": True, "N": False}
 
-        # Check fuzzy match against last name only if multi-word
-        if not is_single_word and last:
-            ratio = fuzzy_ratio(clean_name, last)
-            if ratio >= fuzzy_threshold and ratio > best_ratio:
-                best_ratio = ratio
-                best_match = person['id']
+# Email domains for normalize_school_column; school emails also count Hillel
+HARVARD_EMAIL_RE = re.compile(r"@(?:college\.)?harvard\.edu")
+HARVARD_OTHER_EMAIL_RE = re.compile(r"@(?:hbs\.edu|(?:hms|hsph|fas)\.harvard\.edu)")
+HARVARD_OTHER_SCHOOL_EMAIL_RE = re.compile(r"@(?:hbs\.edu|(?:hms|hsph|fas|hillel)\.harvard\.edu)")
+MIT_EMAIL_RE = re.compile(r"@mit\.edu")
 
-    return best_match
+def _clean_text(values):
+    """Stripped strings, with missing values as ''."""
+    return values.astype(object).where(values.notna(), "").astype(str).str.strip()
 
-def normalize_gender(val):
-    if pd.isna(val): return None
-    s = str(val).strip().lower()
-    if s in {"f","female","woman","girl"}: return "F"
-    if s in {"m","male","man","boy"}: return "M"
-    return None
+def normalize_gender_column(values):
+    """Map a column of gender answers to 'F'/'M', NaN where missing or unrecognized."""
+    return values.dropna().astype(str).str.strip().str.lower().map(GENDER_CODES).reindex(values.index)
 
-def normalize_is_jewish(val):
-    if pd.isna(val): return None
-    s = str(val).strip().upper()
-    if s == 'J': return True
-    if s == 'N': return False
-    return None
+def normalize_is_jewish_column(values):
+    """Map a column of 'J'/'N' answers to True/False, NaN otherwise."""
+    return values.dropna().astype(str).str.strip().str.upper().map(IS_JEWISH_CODES).reindex(values.index)
 
-def normalize_school_with_email(school_response, general_email, school_email):
-    if pd.notna(school_email) and school_email.strip():
-        school_email_clean = str(school_email).strip().lower()
-
-        if any(domain in school_email_clean for domain in [
-            "@harvard.edu", "@college.harvard.edu"
-        ]):
-            return "harvard"
-        elif any(domain in school_email_clean for domain in [
-            "@hbs.edu", "@hms.harvard.edu", "@hsph.harvard.edu",
-            "@fas.harvard.edu", "@hillel.harvard.edu"
-        ]):
-            return "other"
-        elif "@mit.edu" in school_email_clean:
-            return "mit"
-        else:
-            return "other"
-
-    if pd.notna(general_email) and general_email.strip():
-        general_email_clean = str(general_email).strip().lower()
-
-        if any(domain in general_email_clean for domain in [
-            "@harvard.edu", "@college.harvard.edu"
-        ]):
-            return "harvard"
-        elif any(domain in general_email_clean for domain in [
-            "@hbs.edu", "@hms.harvard.edu", "@hsph.harvard.edu",
-            "@fas.harvard.edu"
-        ]):
-            return "other"
-        elif "@mit.edu" in general_email_clean:
-            return "mit"
-        elif ".edu" in general_email_clean:
-            return "other"
-
-    if pd.notna(school_response) and school_response.strip():
-        s = str(school_response).strip().lower()
-        if "harvard" in s and "business" not in s:
-            return "harvard"
-        elif "mit" in s:
-            return "mit"
-        else:
-            return "other"
+def normalize_school_column(school_responses, general_emails, school_emails):
+    """
+    Classify each row as 'harvard', 'mit', 'other', or None.
 
-    return None
+    The school email decides if present, then the general email (only when it
+    identifies a school), then the free-text school answer.
+    """
+    school_email = _clean_text(school_emails).str.lower()
+    general_email = _clean_text(general_emails).str.lower()
+    response = _clean_text(school_responses).str.lower()
+    has_school_email = school_email != ""
+    has_general_email = general_email != ""
+    has_response = response != ""
+
+    # First matching condition wins
+    conditions_and_schools = [
+        (has_school_email & school_email.str.contains(HARVARD_EMAIL_RE), "harvard"),
+        (has_school_email & school_email.str.contains(HARVARD_OTHER_SCHOOL_EMAIL_RE), "other"),
+        (has_school_email & school_email.str.contains(MIT_EMAIL_RE), "mit"),
+        (has_school_email, "other"),
+        (has_general_email & general_email.str.contains(HARVARD_EMAIL_RE), "harvard"),
+        (has_general_email & general_email.str.contains(HARVARD_OTHER_EMAIL_RE), "other"),
+        (has_general_email & general_email.str.contains(MIT_EMAIL_RE), "mit"),
+        (has_general_email & general_email.str.contains(".edu", regex=False), "other"),
+        (has_response & response.str.contains("harvard", regex=False)
+            & ~response.str.contains("business", regex=False), "harvard"),
+        (has_response & response.str.contains("mit", regex=False), "mit"),
+        (has_response, "other"),
+    ]
+    conditions, schools = zip(*conditions_and_schools)
+    return pd.Series(np.select(conditions, schools, default=None), index=school_emails.index)
+
+# Columns written by flush_import_rows()
+PEOPLE_COPY_COLUMNS = ['id', 'first_name', 'last_name', 'gender', 'class_year', 'is_jewish', 'school']
+CONTACT_COPY_COLUMNS = ['person_id', 'contact_type', 'contact_value', 'is_verified']
+ATTENDANCE_COPY_COLUMNS = [
+    'person_id', 'event_id', 'rsvp', 'approved', 'checked_in', 'rsvp_datetime', 'is_first_event', 'invite_token_id'
+]
 
 GRADE_TO_YEAR = {
     "freshman": 2029, "first": 2029, "first year": 2029, "1": 2029, "1st": 2029,
@@ -466,27 +570,30 @@ GRADE_TO_YEAR = {
     "senior": 2026, "fourth": 2026, "4": 2026, "4th": 2026,
 }
 
+# Class year patterns, compiled once for parse_class_year and parse_class_year_column
+YEAR_RE = re.compile(r"(20\d{2})")
+SHORT_YEAR_RE = re.compile(r"['\u2019]\s*(\d{2})")
+GRADE_WORD_RE = re.compile(r"[a-z]+|\d+(?:st|nd|rd|th)?")
+
 def parse_class_year(val):
     if pd.isna(val): return None
     s = str(val).strip()
 
-    m = re.search(r"(20\d{2})", s)
+    m = YEAR_RE.search(s)
     if m:
         return int(m.group(1))
 
-    m = re.search(r"['\']\s*(\d{2})", s)
+    m = SHORT_YEAR_RE.search(s)
     if m:
         short = int(m.group(1))
         return 2000 + short
 
-    t = s.lower()
-    t = t.replace("year", "").strip()
-    t = t.replace("st year", "").replace("nd year", "").replace("rd year", "").replace("th year", "").strip()
+    t = s.lower().replace("year", "").strip()
 
     if t in GRADE_TO_YEAR:
         return GRADE_TO_YEAR[t]
 
-    words = re.findall(r"[a-z]+|\d+(?:st|nd|rd|th)?", t)
+    words = GRADE_WORD_RE.findall(t)
     for w in words:
         yr = GRADE_TO_YEAR.get(w)
         if yr:
@@ -494,6 +601,24 @@ def parse_class_year(val):
 
     return None
 
+def parse_class_year_column(values):
+    """
+    parse_class_year over a column: the year, 'YY and whole-answer grade lookups
+    run as vectorized string operations, and only answers none of them resolve
+    go through parse_class_year's word-by-word fallback.
+    """
+    text = values.dropna().astype(str).str.strip()
+    years = text.str.extract(YEAR_RE, expand=False).astype(float)
+    short_years = text.str.extract(SHORT_YEAR_RE, expand=False).astype(float)
+    years = years.fillna(2000 + short_years)
+
+    grades = text.str.lower().str.replace("year", "", regex=False).str.strip()
+    years = years.fillna(grades.map(GRADE_TO_YEAR))
+
+    unresolved = years.isna()
+    years[unresolved] = text[unresolved].map(parse_class_year).astype(float)
+    return years.reindex(values.index).astype("Int64")
+
 def create_event(conn):
     """Create new event in database. Returns new_event_id or None."""
     with conn.cursor() as cur:
@@ -577,6 +702,88 @@ def select_existing_event(conn):
         print("Invalid input. Please enter a number.")
         return None
 
+def copy_rows(cur, table, columns, rows):
+    """COPY rows (tuples in column order, None for NULL) into table in one round-trip."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(['\\N' if value is None else value for value in row])
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buf
+    )
+
+def flush_import_rows(conn, new_people, renamed_people, contact_rows, attendance_rows, referral_counts):
+    """
+    Write the people, name changes, contacts, attendance and referral counts queued by import_csv.
+
+    New people carry provisional negative ids; real ids are drawn from the People
+    sequence in one query and substituted everywhere before anything is written.
+    Contacts and attendance go through temp staging tables so the ON CONFLICT
+    rules still apply. The caller commits.
+    """
+    with conn.cursor() as cur:
+        if renamed_people:
+            execute_values(cur, """
+                UPDATE People
+                SET first_name = v.first_name, last_name = v.last_name
+                FROM (VALUES %s) AS v(id, first_name, last_name)
+                WHERE People.id = v.id
+            """, [(p['id'], p['first_name'], p['last_name']) for p in renamed_people])
+
+        id_map = {}
+        if new_people:
+            cur.execute(
+                "SELECT nextval(pg_get_serial_sequence('people', 'id')) FROM generate_series(1, %s)",
+                (len(new_people),)
+            )
+            for person, (new_id,) in zip(new_people, cur.fetchall()):
+                id_map[person['id']] = new_id
+            copy_rows(cur, 'People', PEOPLE_COPY_COLUMNS, [
+                (id_map[p['id']], p['first_name'], p['last_name'], p['gender'], p['class_year'], p['is_jewish'], p['school'])
+                for p in new_people
+            ])
+
+        def real_id(person_id):
+            return id_map.get(person_id, person_id)
+
+        cur.execute("""
+            CREATE TEMP TABLE contacts_stage (
+                person_id INTEGER, contact_type VARCHAR(20), contact_value VARCHAR(100), is_verified BOOLEAN
+            ) ON COMMIT DROP
+        """)
+        copy_rows(cur, 'contacts_stage', CONTACT_COPY_COLUMNS,
+                  [(real_id(row[0]),) + row[1:] for row in contact_rows])
+        cur.execute("""
+            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
+            SELECT person_id, contact_type, contact_value, is_verified FROM contacts_stage
+            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
+        """)
+
+        cur.execute("""
+            CREATE TEMP TABLE attendance_stage (
+                person_id INTEGER, event_id INTEGER, rsvp BOOLEAN, approved BOOLEAN, checked_in BOOLEAN,
+                rsvp_datetime TIMESTAMP, is_first_event BOOLEAN, invite_token_id INTEGER
+            ) ON COMMIT DROP
+        """)
+        copy_rows(cur, 'attendance_stage', ATTENDANCE_COPY_COLUMNS,
+                  [(real_id(row[0]),) + row[1:] for row in attendance_rows])
+        # First row per person wins, as with the old per-row inserts
+        cur.execute(f"""
+            INSERT INTO Attendance ({', '.join(ATTENDANCE_COPY_COLUMNS)})
+            SELECT {', '.join(ATTENDANCE_COPY_COLUMNS)} FROM attendance_stage
+            ON CONFLICT (person_id, event_id) DO NOTHING
+        """)
+
+        if referral_counts:
+            execute_values(cur, """
+                UPDATE People
+                SET referral_count = referral_count + v.n
+                FROM (VALUES %s) AS v(id, n)
+                WHERE People.id = v.id
+            """, [(real_id(person_id), n) for person_id, n in referral_counts.items()])
+
 def import_csv(csv_path, new_event_id, log_people=False):
     """Main import logic from notebook."""
     # Configuration - hardcoded column mappings (can be parameterized later if needed)
@@ -597,20 +804,9 @@ def import_csv(csv_path, new_event_id, log_people=False):
     # Detect referral column (any column with "referral" in the name)
     referral_column = None
 
-    # Load CSV - first peek at columns to build dtype dict safely
-    df_peek = pd.read_csv(csv_path, nrows=0)
-    available_columns = set(df_peek.columns)
-
-    # Build dtype dict only for columns that exist
-    dtype_dict = {}
-    if phone_column in available_columns:
-        dtype_dict[phone_column] = str
-    if email_column in available_columns:
-        dtype_dict[email_column] = str
-    if school_email_column in available_columns:
-        dtype_dict[school_email_column] = str
-
     # Load CSV with explicit dtype for phone/email columns to prevent float conversion
+    # (read_csv ignores dtype entries for columns the file doesn't have)
+    dtype_dict = {phone_column: str, email_column: str, school_email_column: str}
     df_current = pd.read_csv(csv_path, dtype=dtype_dict, header=0)
 
     # Filter out any rows that appear to be duplicate headers
@@ -628,21 +824,35 @@ def import_csv(csv_path, new_event_id, log_people=False):
             break
 
     # Normalize data - use safe column access
-    df_current["_norm_gender"] = safe_get_column(df_current, gender_column_raw).apply(normalize_gender)
-    df_current["_norm_school"] = df_current.apply(
-        lambda r: normalize_school_with_email(
-            r.get(school_column_raw, pd.NA),
-            r.get(email_column, ""),
-            r.get(school_email_column, pd.NA)
-        ),
-        axis=1
+    df_current["_norm_gender"] = normalize_gender_column(safe_get_column(df_current, gender_column_raw))
+    df_current["_norm_school"] = normalize_school_column(
+        safe_get_column(df_current, school_column_raw),
+        safe_get_column(df_current, email_column),
+        safe_get_column(df_current, school_email_column)
     )
-    df_current["_norm_class_year"] = safe_get_column(df_current, year_column_raw).apply(parse_class_year)
+    df_current["_norm_class_year"] = parse_class_year_column(safe_get_column(df_current, year_column_raw))
     if "is_jewish" in df_current.columns:
-        df_current["_norm_is_jewish"] = df_current["is_jewish"].apply(normalize_is_jewish)
+        df_current["_norm_is_jewish"] = normalize_is_jewish_column(df_current["is_jewish"])
     else:
         df_current["_norm_is_jewish"] = None
 
+    # Clean names and contact values, with missing values as ""
+    df_current["_first_name_clean"] = _clean_text(safe_get_column(df_current, first_name_column)).str.title()
+    df_current["_last_name_clean"] = _clean_text(safe_get_column(df_current, last_name_column)).str.title()
+    df_current["_email_clean"] = _clean_text(safe_get_column(df_current, email_column)).str.lower()
+    df_current["_school_email_clean"] = _clean_text(safe_get_column(df_current, school_email_column)).str.lower()
+    df_current["_phone_clean"] = _clean_text(safe_get_column(df_current, phone_column))
+    df_current["_email_is_edu"] = df_current["_email_clean"].str.contains(".edu", regex=False)
+
+    # Attendance flags
+    rsvp_status = safe_get_column(df_current, approved_column)
+    df_current["_approved"] = rsvp_status.isin(rsvp_approved_values)
+    df_current["_rsvp"] = rsvp_status.notna()
+    df_current["_checked_in"] = (
+        safe_get_column(df_current, attendance_column, None).astype(str).str.strip().str.lower()
+        .isin(["1", "1.0", "true", "yes"])
+    )
+
     # Handle invite token column if it exists
     if invite_token_column in df_current.columns:
         df_current[invite_token_column] = df_current[invite_token_column].apply(
@@ -652,9 +862,13 @@ def import_csv(csv_path, new_event_id, log_people=False):
     print("Data normalized successfully.")
 
     conn = get_db_connection()
-    CONNECTION_REFRESH_INTERVAL = 50  # Refresh connection every N rows to prevent timeout
 
     try:
+        # Snapshot People and Contacts once; find_person_id matches against it
+        people_cache = load_people_cache(conn)
+        # End the snapshot's transaction so the matching loop doesn't hold it open
+        conn.commit()
+
         # Process invite tokens
         if invite_token_column in df_current.columns:
             df_current[invite_token_column] = df_current[invite_token_column].fillna("default")
@@ -671,34 +885,46 @@ def import_csv(csv_path, new_event_id, log_people=False):
                 for token in existing_tokens:
                     invite_token_map[token['value']] = token['id']
 
-            with conn.cursor() as cur:
-                for token in unique_tokens:
-                    token_str = str(token)
-                    # Truncate to 100 characters to match database constraint
-                    if len(token_str) > 100:
-                        print(f"⚠️  Warning: Truncating tracking link from {len(token_str)} to 100 chars: '{token_str[:50]}...'")
-                        token_str_truncated = token_str[:100]
-                    else:
-                        token_str_truncated = token_str
-
-                    if token_str_truncated not in invite_token_map:
-                        category = "personal outreach" if token_str_truncated != "default" else "mailing list"
-                        cur.execute("""
-                            INSERT INTO InviteTokens (event_id, category, value, description)
-                            VALUES (%s, %s, %s, %s)
-                            RETURNING id
-                        """, (new_event_id, category, token_str_truncated, ""))
-                        new_id = cur.fetchone()[0]
-                        invite_token_map[token_str_truncated] = new_id
-                    # Map original token to the truncated version's ID
-                    if token_str != token_str_truncated:
-                        invite_token_map[token_str] = invite_token_map[token_str_truncated]
+            # Tokens new to this event, inserted below in one statement
+            new_token_rows = {}
+            truncated_tokens = {}
+            for token in unique_tokens:
+                token_str = str(token)
+                # Truncate to 100 characters to match database constraint
+                if len(token_str) > 100:
+                    print(f"⚠️  Warning: Truncating tracking link from {len(token_str)} to 100 chars: '{token_str[:50]}...'")
+                    token_str_truncated = token_str[:100]
+                    truncated_tokens[token_str] = token_str_truncated
+                else:
+                    token_str_truncated = token_str
+
+                if token_str_truncated not in invite_token_map and token_str_truncated not in new_token_rows:
+                    category = "personal outreach" if token_str_truncated != "default" else "mailing list"
+                    new_token_rows[token_str_truncated] = (new_event_id, category, token_str_truncated, "")
+
+            if new_token_rows:
+                with conn.cursor() as cur:
+                    inserted = execute_values(cur, """
+                        INSERT INTO InviteTokens (event_id, category, value, description)
+                        VALUES %s
+                        RETURNING id, value
+                    """, list(new_token_rows.values()), page_size=len(new_token_rows), fetch=True)
+                invite_token_map.update({value: token_id for token_id, value in inserted})
+
+            # Map original tokens to the truncated version's ID
+            for token_str, token_str_truncated in truncated_tokens.items():
+                invite_token_map[token_str] = invite_token_map[token_str_truncated]
             conn.commit()
             print(f"Processed {len(invite_token_map)} invite tokens.")
         else:
             df_current[invite_token_column] = "default"
             invite_token_map = {"default": 1}
 
+        default_token_id = invite_token_map.get("default")
+        df_current["_invite_token_id"] = df_current[invite_token_column].astype(str).map(
+            lambda token: invite_token_map.get(token, default_token_id)
+        )
+
         # Process each row
         handle_indices_list = []
         processed_count = 0
@@ -706,24 +932,37 @@ def import_csv(csv_path, new_event_id, log_people=False):
         new_contacts_count = 0
         new_attendance_count = 0
 
-        for idx, row in df_current.iterrows():
-            raw_first = row.get(first_name_column, "")
-            raw_last = row.get(last_name_column, "")
-            raw_email = row.get(email_column, "")
-            raw_school_email = row.get(school_email_column, "")
-            raw_phone = row.get(phone_column, "")
-            raw_invite_token = row.get(invite_token_column, "default")
-            raw_rsvp_status = row.get(approved_column, pd.NA)
-            raw_rsvp_datetime = row.get(rsvp_datetime_column, None)
-            raw_attended = row.get(attendance_column, None)
-
-            # Clean names - handle NaN values from pandas
-            first_name_clean = str(raw_first).strip().title() if pd.notna(raw_first) and str(raw_first).strip() else ""
-            last_name_clean = str(raw_last).strip().title() if pd.notna(raw_last) and str(raw_last).strip() else ""
-
-            email_clean = str(raw_email).strip().lower() if pd.notna(raw_email) else ""
-            school_email_clean = str(raw_school_email).strip().lower() if pd.notna(raw_school_email) else ""
-            phone_clean = str(raw_phone).strip() if pd.notna(raw_phone) else ""
+        # Rows written in one batch by flush_import_rows() after the loop
+        new_people = []
+        contact_rows = []
+        attendance_rows = []
+        referral_counts = defaultdict(int)
+        resolved_person_ids = {}
+
+        # Walk the needed columns as plain arrays rather than building a Series per row
+        row_values = zip(*(column.to_numpy() for column in [
+            df_current["_first_name_clean"],
+            df_current["_last_name_clean"],
+            df_current["_email_clean"],
+            df_current["_school_email_clean"],
+            df_current["_phone_clean"],
+            df_current["_email_is_edu"],
+            df_current[invite_token_column],
+            df_current["_invite_token_id"],
+            df_current["_approved"],
+            df_current["_rsvp"],
+            df_current["_checked_in"],
+            safe_get_column(df_current, rsvp_datetime_column, None),
+            safe_get_column(df_current, referral_column),
+            df_current["_norm_gender"],
+            df_current["_norm_class_year"],
+            df_current["_norm_is_jewish"],
+            df_current["_norm_school"],
+        ]))
+
+        for (first_name_clean, last_name_clean, email_clean, school_email_clean, phone_clean, email_is_edu,
+             raw_invite_token, invite_token_id, approved_val, rsvp_val, checked_in_val,
+             raw_rsvp_datetime, raw_referral, norm_gender, norm_class_year, norm_is_jewish, norm_school) in row_values:
 
             primary_email_for_matching = school_email_clean if school_email_clean else email_clean
 
@@ -734,148 +973,85 @@ def import_csv(csv_path, new_event_id, log_people=False):
                 "phone": phone_clean
             }
 
-            matched_person_id = find_person_id(
-                row_dict_for_matching,
-                conn,
-                email_col="email",
-                phone_col="phone",
-                handle_indices_list=handle_indices_list,
-                fuzzy_threshold=0.80
-            )
+            # Repeat registrations resolve to whoever the first one matched or created
+            # (rows with no first name, email or phone always get a new person)
+            match_key = None
+            if first_name_clean or primary_email_for_matching or phone_clean:
+                match_key = (first_name_clean, last_name_clean, primary_email_for_matching, phone_clean)
+            matched_person_id = resolved_person_ids.get(match_key)
+            if matched_person_id is None:
+                matched_person_id = find_person_id(
+                    row_dict_for_matching,
+                    people_cache,
+                    email_col="email",
+                    phone_col="phone",
+                    handle_indices_list=handle_indices_list,
+                    fuzzy_threshold=0.80
+                )
 
-            # Create new person if no match
+            # Create new person if no match (under a provisional id until the final flush)
             if not matched_person_id and matched_person_id != 0:
-                norm_gender = na_to_none(row.get("_norm_gender", None))
-                norm_school = na_to_none(row.get("_norm_school", None))
-                norm_class_year = na_to_none(row.get("_norm_class_year", None))
-                norm_is_jewish = na_to_none(row.get("_norm_is_jewish", None))
-
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO People (first_name, last_name, gender, class_year, is_jewish, school, preferred_name)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        RETURNING id
-                    """, (
-                        first_name_clean,
-                        last_name_clean,
-                        norm_gender,
-                        norm_class_year,
-                        norm_is_jewish,
-                        norm_school,
-                        None
-                    ))
-                    matched_person_id = cur.fetchone()[0]
-                conn.commit()
+                norm_class_year = na_to_none(norm_class_year)
+                matched_person_id = -(len(new_people) + 1)
+                new_person = {
+                    'id': matched_person_id,
+                    'first_name': first_name_clean,
+                    'last_name': last_name_clean,
+                    'gender': na_to_none(norm_gender),
+                    'class_year': int(norm_class_year) if norm_class_year is not None else None,
+                    'is_jewish': na_to_none(norm_is_jewish),
+                    'school': na_to_none(norm_school),
+                }
+                new_people.append(new_person)
+                people_cache['provisional'].add(matched_person_id)
+                cache_add_person(people_cache, new_person)
                 new_people_count += 1
-
-                with conn.cursor() as cur:
-                    if school_email_clean:
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, "school email", school_email_clean, False))
-                        new_contacts_count += 1
-
-                    if email_clean and email_clean != school_email_clean:
-                        contact_type = "school email" if ".edu" in email_clean else "personal email"
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, contact_type, email_clean, False))
-                        new_contacts_count += 1
-
-                    if phone_clean:
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, "phone", phone_clean, False))
-                        new_contacts_count += 1
-                conn.commit()
-
-            else:
-                with conn.cursor() as cur:
-                    if school_email_clean:
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, "school email", school_email_clean, False))
-
-                    if email_clean and email_clean != school_email_clean:
-                        contact_type = "school email" if ".edu" in email_clean else "personal email"
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, contact_type, email_clean, False))
-
-                    if phone_clean:
-                        cur.execute("""
-                            INSERT INTO Contacts (person_id, contact_type, contact_value, is_verified)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (person_id, contact_type, contact_value) DO NOTHING
-                        """, (matched_person_id, "phone", phone_clean, False))
-                conn.commit()
+                new_contacts_count += bool(school_email_clean) + bool(email_clean and email_clean != school_email_clean) + bool(phone_clean)
+            if match_key:
+                resolved_person_ids[match_key] = matched_person_id
+
+            # Queue contacts, keeping the cache's contact indexes in step
+            queued_from = len(contact_rows)
+            if school_email_clean:
+                contact_rows.append((matched_person_id, "school email", school_email_clean, False))
+            if email_clean and email_clean != school_email_clean:
+                contact_type = "school email" if email_is_edu else "personal email"
+                contact_rows.append((matched_person_id, contact_type, email_clean, False))
+            if phone_clean:
+                contact_rows.append((matched_person_id, "phone", phone_clean, False))
+            for _, contact_type, contact_value, _ in contact_rows[queued_from:]:
+                cache_add_contact(people_cache, matched_person_id, contact_type, contact_value)
 
             # Create attendance record
-            approved_val = raw_rsvp_status in rsvp_approved_values
-            checked_in_val = str(raw_attended).strip().lower() in ["1", "1.0", "true", "yes"]
-            rsvp_val = not pd.isna(raw_rsvp_status) or raw_rsvp_status == ""
-
-            token_str = str(raw_invite_token)
-            invite_token_id = invite_token_map.get(token_str, invite_token_map.get("default"))
-
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO Attendance
-                    (person_id, event_id, rsvp, approved, checked_in, rsvp_datetime, is_first_event, invite_token_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (person_id, event_id) DO NOTHING
-                """, (
-                    matched_person_id,
-                    new_event_id,
-                    rsvp_val,
-                    approved_val,
-                    checked_in_val,
-                    na_to_none(raw_rsvp_datetime),
-                    False,
-                    invite_token_id
-                ))
-            conn.commit()
+            attendance_rows.append((
+                matched_person_id,
+                new_event_id,
+                rsvp_val,
+                approved_val,
+                checked_in_val,
+                na_to_none(raw_rsvp_datetime),
+                False,
+                invite_token_id
+            ))
             new_attendance_count += 1
 
             # Log person information if logging is enabled
             if log_people and matched_person_id:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    # Get person info with email
-                    cur.execute("""
-                        SELECT
-                            p.first_name,
-                            p.last_name,
-                            COALESCE(
-                                (SELECT contact_value FROM Contacts WHERE person_id = p.id AND contact_type = 'school email' LIMIT 1),
-                                (SELECT contact_value FROM Contacts WHERE person_id = p.id AND contact_type = 'personal email' LIMIT 1)
-                            ) as email
-                        FROM People p
-                        WHERE p.id = %s
-                    """, (matched_person_id,))
-                    person_info = cur.fetchone()
+                person_info = people_cache['people'][matched_person_id]
+                person_emails = people_cache['emails'].get(matched_person_id, {})
+                person_email = person_emails.get('school email') or person_emails.get('personal email')
 
                 # Determine referral code from invite token or referral column
                 referral_code = "N/A"
                 if raw_invite_token and not pd.isna(raw_invite_token) and str(raw_invite_token).lower() not in ['default', 'email', 'txt', 'insta', 'maillist']:
                     referral_code = str(raw_invite_token)
-                elif referral_column and referral_column in row.index and not pd.isna(row[referral_column]):
-                    referral_code = str(row[referral_column])
+                elif not pd.isna(raw_referral):
+                    referral_code = str(raw_referral)
 
                 # Attendance status
                 attendance_status = "✓ Attended" if checked_in_val else "✗ No-show"
 
-                if person_info:
-                    print(f"  📋 {person_info['first_name']} {person_info['last_name']} | {person_info['email'] or 'No email'} | {attendance_status} | Referral: {referral_code}")
+                print(f"  📋 {person_info['first_name']} {person_info['last_name']} | {person_email or 'No email'} | {attendance_status} | Referral: {referral_code}")
 
             # Increment referral count if this person checked in and was referred
             if checked_in_val:
@@ -883,45 +1059,51 @@ def import_csv(csv_path, new_event_id, log_people=False):
 
                 # 1. Check tracking link for referral
                 if raw_invite_token and not pd.isna(raw_invite_token):
-                    referrer_id = match_tracking_link_to_person(conn, raw_invite_token)
+                    referrer_id = cached_match(
+                        people_cache,
+                        ('tracking link', raw_invite_token),
+                        lambda: match_tracking_link_to_person(people_cache, raw_invite_token)
+                    )
                     if referrer_id:
                         print(f"  → Tracking link '{raw_invite_token}' matched to person ID {referrer_id}")
 
                 # 2. Check referral column if it exists
-                if referral_column and referral_column in row.index and not pd.isna(row[referral_column]):
-                    referrer_name = str(row[referral_column]).strip()
+                if not pd.isna(raw_referral):
+                    referrer_name = str(raw_referral).strip()
                     # Create a fake row for find_person_id
-                    referrer_row = pd.Series({
+                    referrer_row = {
                         "first_name": referrer_name,
                         "last_name": ""
-                    })
-                    referrer_match = find_person_id(referrer_row, conn, fuzzy_threshold=0.8, handle_indices_list=[])
+                    }
+                    referrer_match = cached_match(
+                        people_cache,
+                        ('referrer', referrer_name.lower()),
+                        lambda: find_person_id(referrer_row, people_cache, fuzzy_threshold=0.8, handle_indices_list=[])
+                    )
                     if referrer_match:
                         referrer_id = referrer_match
                         print(f"  → Referral column '{referrer_name}' matched to person ID {referrer_id}")
 
                 # Increment referral count
                 if referrer_id and referrer_id != matched_person_id:  # Don't count self-referrals
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            UPDATE People
-                            SET referral_count = referral_count + 1
-                            WHERE id = %s
-                        """, (referrer_id,))
-                    conn.commit()
+                    referral_counts[referrer_id] += 1
                     print(f"  ✓ Incremented referral_count for person ID {referrer_id}")
 
             processed_count += 1
 
-            # Refresh connection periodically to prevent timeouts
-            if processed_count % CONNECTION_REFRESH_INTERVAL == 0:
-                print(f"\n--- Processed {processed_count} rows, refreshing connection ---")
-                conn = ensure_connection(conn, force_refresh=True)
-
-            elif processed_count % 10 == 0:
+            if processed_count % 10 == 0:
                 print(f"Processed {processed_count}/{len(df_current)} rows...")
 
-        # Final commit to save all remaining work
+        # Write all queued rows and commit them together. Nothing is written
+        # before the commit, so a connection dropped mid-flush can be retried
+        # once on a fresh connection.
+        renamed_people = [people_cache['people'][person_id] for person_id in sorted(people_cache['renamed'])]
+        flush_args = (new_people, renamed_people, contact_rows, attendance_rows, referral_counts)
+        try:
+            flush_import_rows(conn, *flush_args)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            conn = reconnect(conn)
+            flush_import_rows(conn, *flush_args)
         conn.commit()
         print("\n✓ Final commit successful")
 
@@ -951,6 +1133,20 @@ def update_mailing_lists():
     conn = get_db_connection()
 
     try:
+        # Both tables are rebuilt in one transaction from one pass over Attendance.
+        # They are derived data, so an unflushed commit lost to a crash is just rebuilt.
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL synchronous_commit = OFF")
+            cur.execute("""
+                CREATE TEMP TABLE attendance_stats ON COMMIT DROP AS
+                SELECT
+                    person_id,
+                    SUM(CASE WHEN checked_in THEN 1 ELSE 0 END) as event_attendance_count,
+                    SUM(CASE WHEN rsvp THEN 1 ELSE 0 END) as event_rsvp_count
+                FROM Attendance
+                GROUP BY person_id
+            """)
+
         # Update MailingList table
         with conn.cursor() as cur:
             cur.execute("TRUNCATE TABLE MailingList RESTART IDENTITY CASCADE")
@@ -961,15 +1157,7 @@ def update_mailing_lists():
                 event_attendance_count, event_rsvp_count,
                 school_email, personal_email, preferred_email, phone_number
             )
-            WITH attendance_stats AS (
-                SELECT
-                    person_id,
-                    SUM(CASE WHEN checked_in THEN 1 ELSE 0 END) as event_attendance_count,
-                    SUM(CASE WHEN rsvp THEN 1 ELSE 0 END) as event_rsvp_count
-                FROM Attendance
-                GROUP BY person_id
-            ),
-            contact_emails AS (
+            WITH contact_emails AS (
                 SELECT
                     person_id,
                     MAX(CASE WHEN contact_type = 'school email' THEN contact_value END) as school_email,
@@ -1002,10 +1190,7 @@ def update_mailing_lists():
             """
 
             cur.execute(query)
-            rows_inserted = cur.rowcount
-            conn.commit()
-
-            print(f"✓ Updated MailingList table with {rows_inserted} entries")
+            mailing_list_rows = cur.rowcount
 
         # Update AllMailing table
         with conn.cursor() as cur:
@@ -1013,31 +1198,26 @@ def update_mailing_lists():
 
             query = """
             INSERT INTO AllMailing (first_name, last_name, school, contact_value, event_count)
-            WITH event_counts AS (
-                SELECT
-                    person_id,
-                    COUNT(*) FILTER (WHERE checked_in = TRUE) as event_count
-                FROM Attendance
-                GROUP BY person_id
-            )
             SELECT
                 p.first_name,
                 p.last_name,
                 p.school,
                 c.contact_value,
-                COALESCE(e.event_count, 0)::NUMERIC(10,1) as event_count
+                COALESCE(a.event_attendance_count, 0)::NUMERIC(10,1) as event_count
             FROM Contacts c
             INNER JOIN People p ON c.person_id = p.id
-            LEFT JOIN event_counts e ON c.person_id = e.person_id
+            LEFT JOIN attendance_stats a ON c.person_id = a.person_id
             WHERE c.contact_type IN ('school email', 'personal email')
             ORDER BY p.last_name, p.first_name
             """
 
             cur.execute(query)
-            rows_inserted = cur.rowcount
-            conn.commit()
+            all_mailing_rows = cur.rowcount
+
+        conn.commit()
 
-            print(f"✓ Updated AllMailing table with {rows_inserted} email contacts")
+        print(f"✓ Updated MailingList table with {mailing_list_rows} entries")
+        print(f"✓ Updated AllMailing table with {all_mailing_rows} email contacts")
 
     except Exception as e:
         conn.rollback()
@@ -1048,6 +1228,50 @@ def update_mailing_lists():
     finally:
         conn.close()
 
+def import_event(csv_path, log_people=False):
+    """Prompt for the target event, import the CSV into it and refresh the mailing lists.
+
+    Returns True on success, False if no event could be selected or created.
+    """
+    conn = get_db_connection()
+    print("✓ Connected to database successfully")
+
+    # Mode selection: new event or add to existing
+    print("\n=== Event Mode Selection ===")
+    mode = input("Create new event or add to existing event? (new/existing): ").strip().lower()
+
+    event_id = None
+
+    if mode == "existing":
+        # Select existing event
+        event_id = select_existing_event(conn)
+        if not event_id:
+            print("Error: Could not select event")
+            conn.close()
+            return False
+    elif mode == "new":
+        # Create new event
+        event_id = create_event(conn)
+        if not event_id:
+            print("Error: Could not create event")
+            conn.close()
+            return False
+    else:
+        print("Invalid mode. Please enter 'new' or 'existing'.")
+        conn.close()
+        return False
+
+    conn.close()
+
+    # Import CSV
+    import_csv(csv_path, event_id, log_people=log_people)
+
+    # Update mailing lists
+    update_mailing_lists()
+
+    print("\n✓ All done!")
+    return True
+
 def main():
     parser = argparse.ArgumentParser(description='Import event data from CSV to PostgreSQL')
     parser.add_argument('csv_file', help='Path to the CSV file to import')
@@ -1062,46 +1286,10 @@ def main():
 
     print(f"Importing from: {csv_path}\n")
 
-    # Test connection
     try:
-        conn = get_db_connection()
-        print("✓ Connected to database successfully")
-
-        # Mode selection: new event or add to existing
-        print("\n=== Event Mode Selection ===")
-        mode = input("Create new event or add to existing event? (new/existing): ").strip().lower()
-
-        event_id = None
-
-        if mode == "existing":
-            # Select existing event
-            event_id = select_existing_event(conn)
-            if not event_id:
-                print("Error: Could not select event")
-                conn.close()
-                sys.exit(1)
-        elif mode == "new":
-            # Create new event
-            event_id = create_event(conn)
-            if not event_id:
-                print("Error: Could not create event")
-                conn.close()
-                sys.exit(1)
-        else:
-            print("Invalid mode. Please enter 'new' or 'existing'.")
-            conn.close()
+        if not import_event(csv_path, log_people=args.log_people):
             sys.exit(1)
 
-        conn.close()
-
-        # Import CSV
-        import_csv(csv_path, event_id, log_people=args.log_people)
-
-        # Update mailing lists
-        update_mailing_lists()
-
-        print("\n✓ All done!")
-
     except Exception as e:
         print(f"Error: {e}")
         import traceback
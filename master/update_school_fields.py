@@ -9,6 +9,8 @@ This script updates the school field in the people table based on email domains:
 The script:
 1. Queries emails from allmailing table first
 2. Looks up people via exact email match to prevent duplicate processing
+   (one joined query per domain, then one UPDATE for everyone needing a change;
+   an email shared by several people updates all of them)
 3. Detects and fixes cross-contamination (e.g., MIT email with "harvard" school)
 4. Updates records where school field is incorrect or missing
 
@@ -31,6 +33,73 @@ DB_CONFIG = {
     'password': os.getenv('PGPASSWORD')
 }
 
+def update_school_for_domain(cursor, domain, school, other_school):
+    """
+    Set school for everyone with an allmailing email ending in domain.
+
+    Each email is matched to every person holding it with one joined query, and
+    every person needing the change is updated with a single UPDATE.
+
+    Returns (emails, updated_count, cross_contamination_count, skipped_count, not_found_count).
+    """
+    # Allmailing emails with each person they belong to (exact match, one row per person)
+    email_query = """
+        SELECT DISTINCT
+            a.contact_value, a.first_name, a.last_name, p.id, p.first_name, p.last_name, p.school
+        FROM (
+            SELECT DISTINCT contact_value, first_name, last_name
+            FROM allmailing
+            WHERE LOWER(contact_value) LIKE %s
+        ) a
+        LEFT JOIN contacts c ON LOWER(c.contact_value) = LOWER(a.contact_value)
+        LEFT JOIN people p ON p.id = c.person_id
+        ORDER BY a.contact_value, a.first_name, a.last_name, p.id;
+    """
+
+    cursor.execute(email_query, ("%" + domain,))
+    matches = cursor.fetchall()
+    emails = list(dict.fromkeys((email, first_name, last_name) for email, first_name, last_name, *_ in matches))
+
+    print(f"Found {len(emails)} {domain} emails in allmailing table")
+    print()
+
+    updated_ids = set()
+    cross_contamination_count = 0
+    skipped_count = 0
+    not_found_count = 0
+
+    for email, first_name, last_name, person_id, db_first_name, db_last_name, school_value in matches:
+        if person_id is None:
+            print(f"  WARNING: No person found for: {email} (listed as {first_name} {last_name} in allmailing)")
+            not_found_count += 1
+            continue
+
+        school_lower = (school_value or "").lower()
+
+        # Check if update is needed (a person reached through a second email is already fixed)
+        is_cross_contamination = other_school in school_lower
+        needs_update = school not in school_lower and person_id not in updated_ids
+
+        if needs_update:
+            updated_ids.add(person_id)
+
+            if is_cross_contamination:
+                print(f"  ⚠ CROSS-CONTAMINATION FIX: {db_first_name} {db_last_name} (ID: {person_id})")
+                cross_contamination_count += 1
+            else:
+                print(f"  ✓ Updated: {db_first_name} {db_last_name} (ID: {person_id})")
+
+            print(f"    Email: {email}")
+            print(f"    Old school: {school_value if school_value else 'NULL'} → New school: {school}")
+            print()
+        else:
+            skipped_count += 1
+
+    if updated_ids:
+        cursor.execute("UPDATE people SET school = %s WHERE id = ANY(%s);", (school, list(updated_ids)))
+
+    return emails, len(updated_ids), cross_contamination_count, skipped_count, not_found_count
+
 def update_school_fields():
     """
     Update school fields for people with Harvard/MIT emails.
@@ -51,134 +120,12 @@ def update_school_fields():
         print()
 
         # ===== Process MIT emails =====
-        # Query allmailing for MIT emails (same as check_school_fields.py)
-        mit_email_query = """
-            SELECT DISTINCT contact_value, first_name, last_name
-            FROM allmailing
-            WHERE LOWER(contact_value) LIKE '%@mit.edu'
-            ORDER BY contact_value;
-        """
-
-        cursor.execute(mit_email_query)
-        mit_emails = cursor.fetchall()
-
-        print(f"Found {len(mit_emails)} @mit.edu emails in allmailing table")
-        print()
-
-        mit_updated_count = 0
-        mit_cross_contamination_count = 0
-        mit_skipped_count = 0
-        mit_not_found_count = 0
-
-        for email, first_name, last_name in mit_emails:
-            # Look up person in people table via contacts table (exact match)
-            lookup_query = """
-                SELECT p.id, p.first_name, p.last_name, p.school
-                FROM people p
-                JOIN contacts c ON c.person_id = p.id
-                WHERE LOWER(c.contact_value) = LOWER(%s);
-            """
-
-            cursor.execute(lookup_query, (email,))
-            person = cursor.fetchone()
-
-            if person:
-                person_id, db_first_name, db_last_name, school = person
-                school_lower = (school or "").lower()
-
-                # Check if update is needed
-                is_cross_contamination = "harvard" in school_lower
-                needs_update = "mit" not in school_lower
-
-                if needs_update:
-                    # Update the school field
-                    update_query = """
-                        UPDATE people
-                        SET school = %s
-                        WHERE id = %s;
-                    """
-                    cursor.execute(update_query, ("mit", person_id))
-
-                    if is_cross_contamination:
-                        print(f"  ⚠ CROSS-CONTAMINATION FIX: {db_first_name} {db_last_name} (ID: {person_id})")
-                        mit_cross_contamination_count += 1
-                    else:
-                        print(f"  ✓ Updated: {db_first_name} {db_last_name} (ID: {person_id})")
-
-                    print(f"    Email: {email}")
-                    print(f"    Old school: {school if school else 'NULL'} → New school: mit")
-                    print()
-                    mit_updated_count += 1
-                else:
-                    mit_skipped_count += 1
-            else:
-                print(f"  WARNING: No person found for: {email} (listed as {first_name} {last_name} in allmailing)")
-                mit_not_found_count += 1
+        (mit_emails, mit_updated_count, mit_cross_contamination_count,
+         mit_skipped_count, mit_not_found_count) = update_school_for_domain(cursor, "@mit.edu", "mit", "harvard")
 
         # ===== Process Harvard emails =====
-        # Query allmailing for Harvard emails
-        harvard_email_query = """
-            SELECT DISTINCT contact_value, first_name, last_name
-            FROM allmailing
-            WHERE LOWER(contact_value) LIKE '%@college.harvard.edu'
-            ORDER BY contact_value;
-        """
-
-        cursor.execute(harvard_email_query)
-        harvard_emails = cursor.fetchall()
-
-        print(f"Found {len(harvard_emails)} @college.harvard.edu emails in allmailing table")
-        print()
-
-        harvard_updated_count = 0
-        harvard_cross_contamination_count = 0
-        harvard_skipped_count = 0
-        harvard_not_found_count = 0
-
-        for email, first_name, last_name in harvard_emails:
-            # Look up person in people table via contacts table (exact match)
-            lookup_query = """
-                SELECT p.id, p.first_name, p.last_name, p.school
-                FROM people p
-                JOIN contacts c ON c.person_id = p.id
-                WHERE LOWER(c.contact_value) = LOWER(%s);
-            """
-
-            cursor.execute(lookup_query, (email,))
-            person = cursor.fetchone()
-
-            if person:
-                person_id, db_first_name, db_last_name, school = person
-                school_lower = (school or "").lower()
-
-                # Check if update is needed
-                is_cross_contamination = "mit" in school_lower
-                needs_update = "harvard" not in school_lower
-
-                if needs_update:
-                    # Update the school field
-                    update_query = """
-                        UPDATE people
-                        SET school = %s
-                        WHERE id = %s;
-                    """
-                    cursor.execute(update_query, ("harvard", person_id))
-
-                    if is_cross_contamination:
-                        print(f"  ⚠ CROSS-CONTAMINATION FIX: {db_first_name} {db_last_name} (ID: {person_id})")
-                        harvard_cross_contamination_count += 1
-                    else:
-                        print(f"  ✓ Updated: {db_first_name} {db_last_name} (ID: {person_id})")
-
-                    print(f"    Email: {email}")
-                    print(f"    Old school: {school if school else 'NULL'} → New school: harvard")
-                    print()
-                    harvard_updated_count += 1
-                else:
-                    harvard_skipped_count += 1
-            else:
-                print(f"  WARNING: No person found for: {email} (listed as {first_name} {last_name} in allmailing)")
-                harvard_not_found_count += 1
+        (harvard_emails, harvard_updated_count, harvard_cross_contamination_count,
+         harvard_skipped_count, harvard_not_found_count) = update_school_for_domain(cursor, "@college.harvard.edu", "harvard", "mit")
 
         # Commit all changes
         conn.commit()